@@ -1,6 +1,5 @@
 """bytcode Terminal UI — Textual app for the bytA workflow orchestrator."""
 
-import subprocess
 import sys
 import time
 from pathlib import Path
@@ -26,8 +25,17 @@ from textual.widgets import (
     TextArea,
 )
 
-from .config import COVERAGE_OPTIONS, PHASES, PhaseType, Scope, WorkflowConfig
+from .config import (
+    COVERAGE_OPTIONS,
+    PHASES,
+    PhaseType,
+    PromptLayout,
+    Scope,
+    WorkflowConfig,
+)
+from .gitservice import git_service
 from .orchestrator import Orchestrator, PhaseResult, PhaseStatus, PreExistingInfo, detect_existing_workflow
+from .uibus import UpdateBus
 
 # Status indicator symbols
 STATUS_ICONS: dict[PhaseStatus, str] = {
@@ -46,30 +54,9 @@ def _fmt_elapsed(seconds: float) -> str:
     return f"{m}:{s:02d}"
 
 
-def _fetch_branches(project_dir: Path) -> list[str]:
-    """Get available remote branches via git."""
-    try:
-        result = subprocess.run(
-            ["git", "branch", "-r", "--no-color"],
-            capture_output=True,
-            text=True,
-            cwd=str(project_dir),
-            timeout=10,
-        )
-        if result.returncode != 0:
-            return ["main"]
-        branches: list[str] = []
-        for line in result.stdout.splitlines():
-            name = line.strip()
-            if not name or "HEAD" in name:
-                continue
-            if "/" in name:
-                name = name.split("/", 1)[1]
-            if name not in branches:
-                branches.append(name)
-        return branches if branches else ["main"]
-    except Exception:
-        return ["main"]
+async def _fetch_branches(project_dir: Path) -> list[str]:
+    """Get available remote branches via git (off the UI thread)."""
+    return await git_service(project_dir).remote_branches_async() or ["main"]
 
 
 class ResizeHandle(Static):
@@ -592,6 +579,9 @@ class BytcodeApp(App[None]):
 
     TITLE = "bytcode"
 
+    # Max UI refreshes per second for orchestrator updates (batched via UpdateBus)
+    UI_UPDATES_PER_S = 20
+
     BINDINGS = [
         Binding("f1", "approve", "Approve"),
         Binding("f2", "feedback", "Feedback"),
@@ -601,10 +591,19 @@ class BytcodeApp(App[None]):
         Binding("q", "quit", "Quit"),
     ]
 
-    def __init__(self, issue_num: int, project_dir: Path) -> None:
+    def __init__(
+        self,
+        issue_num: int,
+        project_dir: Path,
+        *,
+        watch_context: bool = False,
+        prompt_layout: PromptLayout = PromptLayout.CLASSIC,
+    ) -> None:
         super().__init__()
         self.issue_num = issue_num
         self.project_dir = project_dir
+        self.watch_context = watch_context
+        self.prompt_layout = prompt_layout
         self.config: WorkflowConfig | None = None
         self.orchestrator: Orchestrator | None = None
         self._awaiting_result: PhaseResult | None = None
@@ -613,6 +612,8 @@ class BytcodeApp(App[None]):
         self._tick_timer: Timer | None = None
         self._tick_count: int = 0
         self._resume_from: int = 0
+        # Orchestrator (worker thread) -> UI updates, applied by _drain_updates
+        self._updates = UpdateBus()
 
     def compose(self) -> ComposeResult:
         yield Header()
@@ -643,6 +644,7 @@ class BytcodeApp(App[None]):
 
     def on_mount(self) -> None:
         self.sub_title = f"Issue #{self.issue_num}"
+        self.set_interval(1 / self.UI_UPDATES_PER_S, self._drain_updates)
 
         # Check for existing workflow
         existing = detect_existing_workflow(self.project_dir, self.issue_num)
@@ -653,8 +655,9 @@ class BytcodeApp(App[None]):
         else:
             self._show_setup()
 
-    def _show_setup(self) -> None:
-        branches = _fetch_branches(self.project_dir)
+    @work(exclusive=True, group="setup")
+    async def _show_setup(self) -> None:
+        branches = await _fetch_branches(self.project_dir)
         self.push_screen(
             SetupScreen(self.issue_num, branches), self._on_setup_complete
         )
@@ -710,6 +713,7 @@ class BytcodeApp(App[None]):
         config = self.config
         if not config:
             return
+        config.prompt_layout = self.prompt_layout
         log = self.query_one("#main-panel", RichLog)
         log.write("[bold]bytcode v0.1.0[/]")
         log.write(f"Issue:    #{config.issue_num}")
@@ -717,6 +721,7 @@ class BytcodeApp(App[None]):
         log.write(f"Coverage: {config.target_coverage}%")
         log.write(f"UI:       {'Yes' if config.ui_designer else 'No'}")
         log.write(f"Scope:    {config.scope.value}")
+        log.write(f"Prompt:   {config.prompt_layout.value}")
         log.write(f"Project:  {self.project_dir}")
         if self._resume_from > 0:
             log.write(f"[bold yellow]Resume:   from Phase {self._resume_from}[/]")
@@ -735,29 +740,35 @@ class BytcodeApp(App[None]):
             on_activity=self._on_activity,
             on_live_log=self._on_live_log,
             on_summary=self._on_summary,
+            watch_context=self.watch_context,
         )
         result = await self.orchestrator.run(resume_from=self._resume_from)
         self._handle_phase_result(result)
 
+    def _drain_updates(self) -> None:
+        """Apply all updates posted by the orchestrator since the last drain."""
+        for callback, args in self._updates.drain():
+            callback(*args)
+
     def _on_output(self, text: str) -> None:
-        self.call_from_thread(self._append_log, text)
+        self._updates.post(self._append_log, text)
 
     def _append_log(self, text: str) -> None:
         log = self.query_one("#main-panel", RichLog)
         log.write(text)
 
     def _on_phase_change(self, phase_num: int, status: PhaseStatus) -> None:
-        self.call_from_thread(self._update_phase_status, phase_num, status)
+        self._updates.post(self._update_phase_status, phase_num, status)
 
     def _on_live_log(self, text: str) -> None:
-        self.call_from_thread(self._append_live_log, text)
+        self._updates.post(self._append_live_log, text)
 
     def _append_live_log(self, text: str) -> None:
         live = self.query_one("#live-log", RichLog)
         live.write(text)
 
     def _on_summary(self, title: str, markdown: str) -> None:
-        self.call_from_thread(self._update_summary, title, markdown)
+        self._updates.post(self._update_summary, title, markdown)
 
     def _update_summary(self, title: str, markdown: str) -> None:
         panel = self.query_one("#summary-panel", Markdown)
@@ -865,11 +876,12 @@ class BytcodeApp(App[None]):
         pass  # check_action handles visibility via _awaiting_result
 
     def _handle_phase_result(self, result: PhaseResult | None) -> None:
+        # Through the bus, so these follow the phase's queued output
         if result is None:
-            self.call_from_thread(self._workflow_complete)
+            self._updates.post(self._workflow_complete)
         elif result.status == PhaseStatus.AWAITING_PREEXISTING:
             self._awaiting_result = result
-            self.call_from_thread(self._show_preexisting_screen, result)
+            self._updates.post(self._show_preexisting_screen, result)
         else:
             self._awaiting_result = result
 
@@ -1063,6 +1075,17 @@ def main() -> None:
         default=Path.cwd(),
         help="Project directory (default: current directory)",
     )
+    run_parser.add_argument(
+        "--prompt-layout",
+        choices=[layout.value for layout in PromptLayout],
+        default=PromptLayout.CLASSIC.value,
+        help="Prompt section order; cache-friendly puts stable sections first",
+    )
+    run_parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep codebase context updated in the background while agents run",
+    )
 
     args = parser.parse_args()
 
@@ -1075,7 +1098,12 @@ def main() -> None:
         print(f"Error: {project_dir} is not a directory", file=sys.stderr)
         sys.exit(1)
 
-    app = BytcodeApp(issue_num=args.issue, project_dir=project_dir)
+    app = BytcodeApp(
+        issue_num=args.issue,
+        project_dir=project_dir,
+        watch_context=args.watch,
+        prompt_layout=PromptLayout(args.prompt_layout),
+    )
     app.run()
 
 
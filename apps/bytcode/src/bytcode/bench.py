@@ -0,0 +1,258 @@
+"""Benchmark harness for codebase context generation.
+
+Generates a synthetic Spring Boot + Angular project of configurable size,
+times each stage of structure.md generation and reports peak memory:
+
+    python -m bytcode.bench --entities 400 --controllers 150 --save base.json
+    python -m bytcode.bench --entities 400 --controllers 150 --baseline base.json
+
+With --baseline, exits non-zero if any stage is slower than
+baseline * tolerance (stages faster than the noise floor are ignored).
+"""
+
+import argparse
+import json
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable
+
+from .codebase import (
+    STRUCTURE_SECTIONS,
+    ContextFocus,
+    budget_structure,
+    build_file_index,
+    generate_structure,
+    tracked_files,
+    write_structure,
+)
+from .symbols import SymbolIndex, parse_entity_fields, parse_routes
+
+_JAVA_ROOT = "backend/src/main/java/com/acme"
+_MIGRATION_DIR = "backend/src/main/resources/db/migration"
+_APP_ROOT = "frontend/src/app"
+
+# Stages faster than this (seconds) are never reported as regressions
+_NOISE_FLOOR_S = 0.005
+
+
+@dataclass
+class ProjectShape:
+    """Sizes of the synthetic project."""
+
+    entities: int = 200
+    fields: int = 12
+    controllers: int = 80
+    routes: int = 6
+    components: int = 150
+    migrations: int = 120
+    node_modules: int = 5_000
+
+
+def generate_project(root: Path, shape: ProjectShape) -> None:
+    """Write a synthetic project with the given shape under root."""
+    def write(rel: str, content: str) -> None:
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+
+    write("pom.xml", "<project><artifactId>bench</artifactId></project>\n")
+    write("backend/pom.xml", "<project><artifactId>spring-boot</artifactId></project>\n")
+    write("frontend/package.json", json.dumps({"dependencies": {"@angular/core": "^21.0.0"}}))
+    write("frontend/angular.json", "{}\n")
+
+    for i in range(shape.entities):
+        fields = "\n".join(
+            f"    @Column(name = \"f{j}\")\n    private String field{j};"
+            for j in range(shape.fields)
+        )
+        write(
+            f"{_JAVA_ROOT}/entity/Entity{i}.java",
+            f"package com.acme.entity;\n\n/** Entity {i}. */\n@Entity\n"
+            f"public class Entity{i} {{\n    @Id\n    private Long id;\n"
+            f"    @ManyToOne\n    private Entity{max(i - 1, 0)} parent;\n"
+            f"{fields}\n\n    public Long getId() {{ return id; }}\n}}\n",
+        )
+
+    for i in range(shape.controllers):
+        methods = "\n".join(
+            f"    @{verb}Mapping(\"/r{j}/{{id}}\")\n"
+            f"    public String r{j}(@PathVariable Long id) {{ return \"\"; }}\n"
+            for j, verb in enumerate(
+                ["Get", "Post", "Put", "Delete", "Patch"][k % 5] for k in range(shape.routes)
+            )
+        )
+        write(
+            f"{_JAVA_ROOT}/controller/Resource{i}Controller.java",
+            f"package com.acme.controller;\n\n@RestController\n"
+            f"@RequestMapping(\"/api/resource{i}\")\n"
+            f"public class Resource{i}Controller {{\n{methods}}}\n",
+        )
+        write(
+            f"{_JAVA_ROOT}/service/Resource{i}Service.java",
+            f"package com.acme.service;\n\n@Service\npublic class Resource{i}Service {{}}\n",
+        )
+
+    for i in range(shape.migrations):
+        write(
+            f"{_MIGRATION_DIR}/V{i + 1}__change_{i}.sql",
+            f"ALTER TABLE entity{i % max(shape.entities, 1)} ADD COLUMN c{i} TEXT;\n",
+        )
+
+    for i in range(shape.components):
+        feature = f"feature{i % 20}"
+        write(
+            f"{_APP_ROOT}/{feature}/widget-{i}.component.ts",
+            f"@Component({{\n  selector: 'app-widget-{i}',\n  template: ''\n}})\n"
+            f"export class Widget{i}Component {{}}\n",
+        )
+        write(f"{_APP_ROOT}/{feature}/widget-{i}.component.spec.ts", "describe('x', () => {});\n")
+    for i in range(max(shape.components // 5, 1)):
+        write(f"{_APP_ROOT}/services/data-{i}.service.ts", f"export class Data{i}Service {{}}\n")
+        write(f"{_APP_ROOT}/models/item-{i}.model.ts", f"export interface Item{i} {{}}\n")
+
+    for i in range(shape.node_modules):
+        write(f"frontend/node_modules/pkg{i % 200}/lib/file{i}.js", "module.exports = {};\n")
+
+
+def _timed(fn: Callable[[], object], repeat: int) -> tuple[float, object]:
+    """Best-of-repeat wall time and the last result."""
+    best = float("inf")
+    result: object = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run_benchmark(root: Path, repeat: int = 3) -> dict[str, float]:
+    """Time each stage of context generation on an existing project.
+
+    Returns stage name -> seconds, plus ``peak_mb`` for generate_structure.
+    Read-only for the project: write_structure runs against a temporary
+    context directory.
+    Note: with enough files parsing moves to a process pool, whose memory is
+    not included in ``peak_mb``.
+    """
+    results: dict[str, float] = {}
+
+    results["file_index"], index = _timed(lambda: build_file_index(root, "walk"), repeat)
+    tracked = tracked_files(index)
+
+    def read(rels: list[str]) -> list[str]:
+        return [(root / r).read_text(encoding="utf-8") for r in rels]
+
+    entity_sources = read(index.match("**/entity/*.java"))
+    results["parse_entities"], _ = _timed(
+        lambda: [parse_entity_fields(src) for src in entity_sources], repeat
+    )
+    controller_sources = read(index.match("**/controller/*.java"))
+    results["parse_routes"], _ = _timed(
+        lambda: [parse_routes(src) for src in controller_sources], repeat
+    )
+
+    with SymbolIndex(":memory:") as symbols:
+        start = time.perf_counter()
+        symbols.sync(root, tracked)
+        results["symbol_sync_cold"] = time.perf_counter() - start
+        results["symbol_sync_warm"], _ = _timed(lambda: symbols.sync(root, tracked), repeat)
+        for name, render in STRUCTURE_SECTIONS:
+            results[f"section_{name}"], _ = _timed(lambda: render(index, symbols), repeat)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    text = generate_structure(root, index)
+    results["generate_structure"] = time.perf_counter() - start
+    results["peak_mb"] = tracemalloc.get_traced_memory()[1] / 1_048_576
+    tracemalloc.stop()
+
+    focus = ContextFocus.from_sources([], [], "widget resource export")
+    results["budget_structure"], _ = _timed(
+        lambda: budget_structure(text, focus, 6_000), repeat
+    )
+
+    # Fresh context dir outside the project: cold run without touching its .workflow/
+    with tempfile.TemporaryDirectory(prefix="bytcode-bench-ctx-") as ctx:
+        ctx_dir = Path(ctx)
+        start = time.perf_counter()
+        write_structure(root, ctx_dir)
+        results["write_structure_cold"] = time.perf_counter() - start
+        results["write_structure_warm"], _ = _timed(
+            lambda: write_structure(root, ctx_dir), repeat
+        )
+    return results
+
+
+def find_regressions(
+    results: dict[str, float], baseline: dict[str, float], tolerance: float
+) -> list[str]:
+    """Stages slower (or heavier) than baseline * tolerance."""
+    regressions: list[str] = []
+    for stage, value in results.items():
+        base = baseline.get(stage)
+        if base is None:
+            continue
+        if stage != "peak_mb" and value < _NOISE_FLOOR_S:
+            continue
+        if value > base * tolerance:
+            regressions.append(f"{stage}: {value:.4f} > {base:.4f} x {tolerance}")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m bytcode.bench",
+        description="Benchmark structure.md generation on a synthetic project",
+    )
+    defaults = ProjectShape()
+    for name, value in asdict(defaults).items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=value)
+    parser.add_argument("--repeat", type=int, default=3, help="Best-of-N timing")
+    parser.add_argument("--project", type=Path, help="Benchmark an existing project instead")
+    parser.add_argument("--baseline", type=Path, help="JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="Allowed slowdown factor")
+    parser.add_argument("--save", type=Path, help="Write results as JSON (new baseline)")
+    args = parser.parse_args(argv)
+
+    shape = ProjectShape(**{name: getattr(args, name) for name in asdict(defaults)})
+    tmp: Path | None = None
+    if args.project:
+        root = args.project.resolve()
+    else:
+        tmp = Path(tempfile.mkdtemp(prefix="bytcode-bench-"))
+        root = tmp / "project"
+        start = time.perf_counter()
+        generate_project(root, shape)
+        print(f"Generated {shape} in {time.perf_counter() - start:.2f}s")
+
+    try:
+        results = run_benchmark(root, args.repeat)
+    finally:
+        if tmp:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    for stage, value in results.items():
+        unit = "MB" if stage == "peak_mb" else "ms"
+        shown = value if stage == "peak_mb" else value * 1000
+        print(f"  {stage:<24} {shown:>10.1f} {unit}")
+
+    if args.save:
+        args.save.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = find_regressions(results, baseline, args.tolerance)
+        if regressions:
+            print("Regressions:", *regressions, sep="\n  ", file=sys.stderr)
+            return 1
+        print("No regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
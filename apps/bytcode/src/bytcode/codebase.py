@@ -4,12 +4,27 @@ Two layers:
 1. structure.md  — Auto-generated (Python, no LLM): file tree, tech stack, key files
 2. architecture.md — Agent-maintained (LLM): entities, endpoints, patterns, relationships
 
-structure.md is regenerated before each phase.
+structure.md is regenerated before each phase, rendered from the persistent
+symbol index in symbols.py (only changed files are re-parsed).
 architecture.md is updated by agents after each phase.
 """
 
-import subprocess
-from pathlib import Path
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from fnmatch import fnmatch
+from pathlib import Path, PurePosixPath
+
+from .filecache import read_cached
+from .gitservice import git_service
+from .symbols import (
+    SymbolIndex,
+    frontend_kind,
+    is_entity_file,
+    is_java_source,
+    is_migration_file,
+)
 
 # Directories to skip in tree generation
 _SKIP_DIRS = {
@@ -18,82 +33,276 @@ _SKIP_DIRS = {
     ".next", "coverage", ".nyc_output", "out", "tmp",
 }
 
-# File extensions to include in key-file inventory
-_BACKEND_ENTITY = "**/entity/*.java"
-_BACKEND_MODEL = "**/model/*.java"
-_BACKEND_CONTROLLER = "**/controller/*.java"
-_BACKEND_RESOURCE = "**/resource/*.java"
-_BACKEND_SERVICE = "**/service/*.java"
-_BACKEND_REPOSITORY = "**/repository/*.java"
-_BACKEND_DTO = "**/dto/**/*.java"
-_BACKEND_MIGRATION = "**/migration/V*.sql"
-_FRONTEND_COMPONENT = "**/*.component.ts"
-_FRONTEND_SERVICE = "**/services/*.service.ts"
-_FRONTEND_MODEL = "**/models/*.model.ts"
-_FRONTEND_ROUTE = "**/app.routes.ts"
-
-
-def generate_structure(project_dir: Path) -> str:
-    """Generate structure.md content: file tree + tech stack + key files."""
+# Persistent symbol index backing structure.md (kept across issues)
+_SYMBOLS_DB = "symbols.db"
+
+
+@dataclass
+class FileIndex:
+    """In-memory file listing of a project, built by one pruned directory walk.
+
+    All structure sections query this index instead of walking the tree
+    themselves. Skip directories (and hidden directories) are pruned during
+    traversal, so node_modules/target/.git are never entered.
+    """
+
+    root: Path
+    files: list[str] = field(default_factory=list)  # POSIX paths relative to root
+    children: dict[str, list[tuple[str, bool]]] = field(default_factory=dict)
+
+    def match(self, pattern: str) -> list[str]:
+        """Return files matching a glob pattern (``**/`` matches any depth)."""
+        regex = _glob_regex(pattern)
+        return [f for f in self.files if regex.fullmatch(f)]
+
+    def by_name(self, pattern: str) -> list[str]:
+        """Return files whose base name matches a glob pattern."""
+        return [f for f in self.files if fnmatch(PurePosixPath(f).name, pattern)]
+
+    def in_dir(self, dir_name: str, pattern: str) -> list[str]:
+        """Return files directly inside a directory called *dir_name*."""
+        result: list[str] = []
+        for f in self.files:
+            parts = f.split("/")
+            if len(parts) >= 2 and parts[-2] == dir_name and fnmatch(parts[-1], pattern):
+                result.append(f)
+        return result
+
+
+def _glob_regex(pattern: str) -> re.Pattern[str]:
+    """Translate a glob with ``**`` support into a regex over POSIX paths."""
+    out: list[str] = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pattern[i] == "*":
+            out.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            out.append("[^/]")
+            i += 1
+        else:
+            out.append(re.escape(pattern[i]))
+            i += 1
+    return re.compile("".join(out))
+
+
+def build_file_index(project_dir: Path, source: str = "auto") -> FileIndex:
+    """Enumerate the project's files once.
+
+    source="git":  one ``git ls-files -co --exclude-standard`` call, so
+                   .gitignore is respected; cached per HEAD and git index.
+    source="walk": pruned os.scandir walk using _SKIP_DIRS.
+    source="auto": git when the project is a git checkout, else walk.
+
+    Skip directories and hidden directories are excluded in both modes.
+    """
+    if source in ("auto", "git"):
+        files = _git_listing(project_dir)
+        if files is not None:
+            return _index_from_paths(project_dir, files)
+    return _walk_index(project_dir)
+
+
+def is_indexed_path(rel: str) -> bool:
+    """False for files below a skip directory or a hidden directory."""
+    return not any(p in _SKIP_DIRS or p.startswith(".") for p in rel.split("/")[:-1])
+
+
+def invalidate_file_index(project_dir: Path) -> None:
+    """Drop cached git results (e.g. after an agent created files)."""
+    git_service(project_dir).invalidate()
+
+
+def _git_listing(project_dir: Path) -> list[str] | None:
+    """Tracked + untracked (non-ignored) files, minus deleted ones."""
+    return git_service(project_dir).ls_files()
+
+
+def _index_from_paths(project_dir: Path, paths: list[str]) -> FileIndex:
+    """Build a FileIndex (including the directory tree) from relative paths."""
+    index = FileIndex(root=project_dir)
+    children: dict[str, set[tuple[str, bool]]] = {"": set()}
+
+    for rel in paths:
+        if not is_indexed_path(rel):
+            continue
+        parts = rel.split("/")
+        index.files.append(rel)
+        parent = ""
+        for i, name in enumerate(parts):
+            is_dir = i < len(parts) - 1
+            children.setdefault(parent, set()).add((name, is_dir))
+            parent = f"{parent}/{name}" if parent else name
+
+    for rel_dir, entries in children.items():
+        index.children[rel_dir] = sorted(entries, key=lambda e: (not e[1], e[0]))
+    return index
+
+
+def _walk_index(project_dir: Path) -> FileIndex:
+    """Walk the project once with os.scandir, pruning skip directories."""
+    index = FileIndex(root=project_dir)
+    stack: list[str] = [""]
+
+    while stack:
+        rel_dir = stack.pop()
+        abs_dir = os.path.join(project_dir, rel_dir) if rel_dir else str(project_dir)
+        entries: list[tuple[str, bool]] = []
+        try:
+            with os.scandir(abs_dir) as it:
+                for entry in it:
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                    if is_dir:
+                        if entry.name in _SKIP_DIRS or entry.name.startswith("."):
+                            continue
+                        stack.append(rel)
+                    else:
+                        index.files.append(rel)
+                    entries.append((entry.name, is_dir))
+        except OSError:
+            continue
+        entries.sort(key=lambda e: (not e[1], e[0]))
+        index.children[rel_dir] = entries
+
+    index.files.sort()
+    return index
+
+
+def generate_structure(project_dir: Path, index: FileIndex | None = None) -> str:
+    """Generate structure.md content: file tree + tech stack + key files.
+
+    Stateless variant: builds a throwaway in-memory symbol index. Use
+    write_structure for the persistent, incremental path.
+    """
+    if index is None:
+        index = build_file_index(project_dir)
+    with SymbolIndex(":memory:") as symbols:
+        symbols.sync(project_dir, tracked_files(index))
+        sections = {name: render(index, symbols) for name, render in STRUCTURE_SECTIONS}
+    return _compose_structure(project_dir, sections)
+
+
+def _compose_structure(project_dir: Path, sections: dict[str, list[str]]) -> str:
     parts: list[str] = [
         "# Codebase Structure",
         f"Project: {project_dir.name}",
         "",
     ]
+    for name, _ in STRUCTURE_SECTIONS:
+        parts.extend(sections.get(name, []))
+    return "\n".join(parts)
 
-    # 1. Tech stack detection
-    tech = _detect_tech_stack(project_dir)
-    if tech:
-        parts.append("## Tech Stack")
-        for key, value in tech.items():
-            parts.append(f"- **{key}**: {value}")
-        parts.append("")
-
-    # 2. Directory tree (depth-limited, compact)
-    tree = _generate_tree(project_dir, max_depth=2)
-    parts.append("## Directory Tree")
-    parts.append("```")
-    parts.extend(tree)
-    parts.append("```")
-    parts.append("")
-
-    # 3. Database migrations (shows schema evolution)
-    migrations = sorted(project_dir.rglob("V*.sql"))
-    migrations = [m for m in migrations if not any(s in str(m) for s in _SKIP_DIRS)]
-    if migrations:
-        parts.append("## Database Migrations")
-        for m in migrations:
-            parts.append(f"- {m.relative_to(project_dir)}")
-        parts.append("")
-
-    # 4. Backend entity fields (quick parse)
-    entities = _parse_java_entities(project_dir)
-    if entities:
-        parts.append("## Entity Summary")
-        for entity_name, fields in entities.items():
-            field_str = ", ".join(fields[:15])  # limit to 15 fields
-            if len(fields) > 15:
-                field_str += ", ..."
-            parts.append(f"- **{entity_name}**: {field_str}")
-        parts.append("")
-
-    # 5. Frontend component list
-    components = _list_frontend_components(project_dir)
-    if components:
-        parts.append("## Frontend Components")
-        for comp in components:
-            parts.append(f"- {comp}")
-        parts.append("")
-
-    # 6. API endpoints (quick grep)
-    endpoints = _find_api_endpoints(project_dir)
-    if endpoints:
-        parts.append("## API Endpoints")
-        for ep in endpoints:
-            parts.append(f"- {ep}")
-        parts.append("")
 
-    return "\n".join(parts)
+def _render_list(heading: str, entries: list[tuple[str, list[str]]]) -> list[str]:
+    """A ``## heading`` list of (entry, children); children become nested items.
+
+    budget_structure keeps or drops an entry together with its children.
+    """
+    if not entries:
+        return []
+    lines = [f"## {heading}"]
+    for entry, children in entries:
+        lines.append(f"- {entry}")
+        lines.extend(f"  - {child}" for child in children)
+    lines.append("")
+    return lines
+
+
+def _render_tech(index: FileIndex, symbols: SymbolIndex) -> list[str]:
+    """1. Tech stack detection."""
+    tech = _detect_tech_stack(index.root, index)
+    return _render_list(
+        "Tech Stack", [(f"**{key}**: {value}", []) for key, value in tech.items()]
+    )
+
+
+def _render_tree(index: FileIndex, symbols: SymbolIndex) -> list[str]:
+    """2. Directory tree (depth-limited, compact)."""
+    lines = ["## Directory Tree", "```"]
+    lines.extend(_generate_tree(index, max_depth=2))
+    lines.extend(["```", ""])
+    return lines
+
+
+def _render_migrations(index: FileIndex, symbols: SymbolIndex) -> list[str]:
+    """3. Database migrations (shows schema evolution)."""
+    return _render_list(
+        "Database Migrations", [(path, []) for path, _, _ in symbols.migrations()]
+    )
+
+
+def _render_entities(index: FileIndex, symbols: SymbolIndex) -> list[str]:
+    """4. Backend entity fields."""
+    entries: list[tuple[str, list[str]]] = []
+    for entity_name, fields in symbols.entities().items():
+        field_str = ", ".join(fields[:15])  # limit to 15 fields
+        if len(fields) > 15:
+            field_str += ", ..."
+        entries.append((f"**{entity_name}**: {field_str}", []))
+    return _render_list("Entity Summary", entries)
+
+
+def _render_frontend(index: FileIndex, symbols: SymbolIndex) -> list[str]:
+    """5. Frontend components, services and models."""
+    lines = _render_list("Frontend Components", [
+        (path + (f" (`{selector}`)" if selector else ""), [])
+        for path, _, selector in symbols.frontend("component")
+    ])
+    for kind, heading in (("service", "Frontend Services"), ("model", "Frontend Models")):
+        names = sorted({name for _, name, _ in symbols.frontend(kind)})
+        if names:
+            lines.extend([f"## {heading}", ", ".join(names), ""])
+    return lines
+
+
+def _render_endpoints(index: FileIndex, symbols: SymbolIndex) -> list[str]:
+    """6. API endpoints (route table from mapping annotations)."""
+    return _render_list("API Endpoints", [
+        (f"**{controller}**", routes)
+        for controller, routes in sorted(symbols.routes().items())
+    ])
+
+
+# structure.md sections in output order: (name, renderer)
+STRUCTURE_SECTIONS = [
+    ("tech", _render_tech),
+    ("tree", _render_tree),
+    ("migrations", _render_migrations),
+    ("entities", _render_entities),
+    ("frontend", _render_frontend),
+    ("endpoints", _render_endpoints),
+]
+
+# Config files whose presence/content drives tech stack detection
+_TECH_FILES = {"package.json", "angular.json", "pom.xml", "build.gradle"}
+
+
+def _affected_sections(rel: str) -> set[str]:
+    """Which structure.md sections depend on the content of this file."""
+    affected: set[str] = set()
+    if PurePosixPath(rel).name in _TECH_FILES and rel.count("/") <= 1:
+        affected.add("tech")
+    if is_migration_file(rel):
+        affected.update(("tech", "migrations"))
+    if is_java_source(rel):
+        affected.add("endpoints")
+    if is_entity_file(rel):
+        affected.add("entities")
+    if frontend_kind(rel):
+        affected.add("frontend")
+    return affected
+
+
+def tracked_files(index: FileIndex) -> list[str]:
+    """Files whose content feeds a structure.md section."""
+    return [rel for rel in index.files if _affected_sections(rel)]
 
 
 def ensure_context_dir(project_dir: Path) -> Path:
@@ -103,11 +312,324 @@ def ensure_context_dir(project_dir: Path) -> Path:
     return ctx_dir
 
 
-def write_structure(project_dir: Path) -> None:
-    """Generate and write structure.md to .workflow/context/."""
-    ctx_dir = ensure_context_dir(project_dir)
-    content = generate_structure(project_dir)
-    (ctx_dir / "structure.md").write_text(content, encoding="utf-8")
+def write_structure(project_dir: Path, context_dir: Path | None = None) -> bool:
+    """Incrementally (re)generate structure.md in .workflow/context/.
+
+    Sections are rendered from the persistent symbol index
+    (.workflow/context/symbols.db). Only files whose content hash changed are
+    re-parsed and only the sections they feed are re-rendered. Returns False
+    if nothing changed and the existing structure.md was kept as-is.
+
+    context_dir overrides where structure.md and symbols.db live (the
+    benchmark writes them outside the project).
+    """
+    if context_dir is None:
+        ctx_dir = ensure_context_dir(project_dir)
+    else:
+        ctx_dir = context_dir
+        ctx_dir.mkdir(parents=True, exist_ok=True)
+    structure_file = ctx_dir / "structure.md"
+    index = build_file_index(project_dir)
+
+    with SymbolIndex(ctx_dir / _SYMBOLS_DB) as symbols:
+        changed = symbols.sync(project_dir, tracked_files(index))
+
+        sections = {name: symbols.get_section(name) for name, _ in STRUCTURE_SECTIONS}
+        dirty: set[str] = {"tree"}  # cheap, rendered from the file index
+        if not structure_file.exists() or None in sections.values():
+            dirty = {name for name, _ in STRUCTURE_SECTIONS}
+        for rel in changed:
+            dirty.update(_affected_sections(rel))
+
+        updated = False
+        for name, render in STRUCTURE_SECTIONS:
+            if name not in dirty:
+                continue
+            lines = render(index, symbols)
+            if lines != sections[name]:
+                sections[name] = lines
+                symbols.put_section(name, lines)
+                updated = True
+
+    if updated or not structure_file.exists():
+        structure_file.write_text(
+            _compose_structure(project_dir, sections), encoding="utf-8"
+        )
+        updated = True
+    return updated
+
+
+# --- Token-budgeted structure.md for prompts ---
+
+# Rough token estimate used for budgeting (no tokenizer dependency)
+_CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(chars: int) -> int:
+    """Approximate token count for a number of characters."""
+    return chars // _CHARS_PER_TOKEN
+
+
+# Default prompt budget for structure.md, in tokens
+STRUCTURE_TOKEN_BUDGET = 6_000
+
+# Always kept in full (a few lines that frame everything else)
+_FIXED_SECTIONS = {"Tech Stack"}
+
+# Share of the budget per structure.md heading (unused share is redistributed)
+_SECTION_SHARES: dict[str, float] = {
+    "Directory Tree": 0.16,
+    "Database Migrations": 0.10,
+    "Entity Summary": 0.26,
+    "Frontend Components": 0.12,
+    "Frontend Services": 0.05,
+    "Frontend Models": 0.05,
+    "API Endpoints": 0.22,
+}
+
+# Sections where, at equal relevance, newer (later) entries win
+_NEWEST_FIRST = {"Database Migrations"}
+
+# Words too generic to signal an issue's domain
+_STOPWORDS = {
+    "about", "after", "also", "because", "before", "being", "both", "could",
+    "does", "each", "from", "have", "into", "just", "like", "more", "must",
+    "need", "only", "other", "should", "some", "such", "than", "that", "their",
+    "them", "then", "there", "these", "they", "this", "when", "where", "which",
+    "while", "will", "with", "would", "your", "oder", "nicht", "eine", "einen",
+    "werden", "wird", "sollte", "soll", "auch", "noch", "nach", "wenn", "dass",
+}
+
+_WORD_RE = re.compile(r"[A-Za-z][A-Za-z0-9]*")
+_CAMEL_RE = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+")
+
+
+@dataclass
+class ContextFocus:
+    """Relevance signals for ranking structure.md entries."""
+
+    changed: set[str] = field(default_factory=set)  # recently changed paths
+    planned: set[str] = field(default_factory=set)  # paths referenced by the plan
+    terms: set[str] = field(default_factory=set)  # issue domain words
+
+    @classmethod
+    def from_sources(
+        cls, changed: list[str], planned: list[str], issue_text: str
+    ) -> "ContextFocus":
+        return cls(
+            changed=set(changed),
+            planned=set(planned),
+            terms=_domain_words(issue_text),
+        )
+
+
+@dataclass
+class ElisionReport:
+    """How much of structure.md was left out to stay within budget."""
+
+    entries: int = 0  # elided entries
+    total: int = 0  # entries before eliding
+    tokens: int = 0  # estimated tokens elided
+
+
+def _domain_words(text: str) -> set[str]:
+    words: set[str] = set()
+    for word in _WORD_RE.findall(text):
+        for part in _CAMEL_RE.findall(word):
+            part = part.lower().removesuffix("s")
+            if len(part) >= 4 and part not in _STOPWORDS:
+                words.add(part)
+    return words
+
+
+def _file_stems(paths: set[str]) -> set[str]:
+    """Lowercase file stems (``usercontroller``, ``user-list``)."""
+    stems = {PurePosixPath(p).name.split(".")[0].lower() for p in paths}
+    return {s for s in stems if s}
+
+
+@dataclass
+class _Entry:
+    lines: list[str]
+    position: int
+    score: int = 0
+    depth: int = 0
+
+    @property
+    def size(self) -> int:
+        return sum(len(line) + 1 for line in self.lines)
+
+
+@dataclass
+class _Block:
+    """One ``## Heading`` block of structure.md, split into rankable entries."""
+
+    heading: str
+    head: list[str]  # heading line (+ opening fence)
+    entries: list[_Entry]
+    tail: list[str]  # closing fence, trailing blank
+    kind: str  # "list", "tree" or "inline"
+
+    @property
+    def size(self) -> int:
+        fixed = sum(len(line) + 1 for line in self.head + self.tail)
+        return fixed + sum(e.size for e in self.entries)
+
+
+def _parse_blocks(text: str) -> tuple[list[str], list[_Block]]:
+    preamble: list[str] = []
+    raw: list[list[str]] = []
+    for line in text.splitlines():
+        if line.startswith("## "):
+            raw.append([line])
+        elif raw:
+            raw[-1].append(line)
+        else:
+            preamble.append(line)
+
+    blocks: list[_Block] = []
+    for lines in raw:
+        heading, body = lines[0], lines[1:]
+        tail: list[str] = []
+        while body and not body[-1].strip():
+            tail.insert(0, body.pop())
+        if body and body[0].startswith("```"):
+            if body[-1].startswith("```"):
+                tail.insert(0, body.pop())
+            entries = [
+                _Entry([line], i, depth=(len(line) - len(line.lstrip("|` "))) // 4)
+                for i, line in enumerate(body[1:])
+            ]
+            blocks.append(_Block(heading[3:], [heading, body[0]], entries, tail, "tree"))
+        elif len(body) == 1 and not body[0].startswith("- "):
+            entries = [_Entry([name], i) for i, name in enumerate(body[0].split(", "))]
+            blocks.append(_Block(heading[3:], [heading], entries, tail, "inline"))
+        else:
+            entries = []
+            for line in body:
+                # Nested items belong to the entry above (e.g. routes of a controller)
+                if line.startswith("  ") and entries:
+                    entries[-1].lines.append(line)
+                else:
+                    entries.append(_Entry([line], len(entries)))
+            blocks.append(_Block(heading[3:], [heading], entries, tail, "list"))
+    return preamble, blocks
+
+
+def _score(entry: _Entry, focus: ContextFocus, changed: set[str], planned: set[str]) -> int:
+    text = "\n".join(entry.lines)
+    tokens = {w.lower() for w in _WORD_RE.findall(text)}
+    parts = {
+        p.lower().removesuffix("s")
+        for w in _WORD_RE.findall(text)
+        for p in _CAMEL_RE.findall(w)
+    }
+    score = 0
+    if any(p in text for p in focus.changed) or tokens & changed:
+        score += 4
+    if any(p in text for p in focus.planned) or tokens & planned:
+        score += 2
+    score += min(len(parts & focus.terms), 3)
+    return score
+
+
+def _elided_marker(block: _Block, count: int) -> str:
+    if block.kind == "tree":
+        return f"... {count} more entries"
+    if block.kind == "inline":
+        return f"... +{count} more"
+    return f"- ... {count} more (omitted for budget)"
+
+
+def _trim_block(block: _Block, budget: int) -> tuple[list[str], int]:
+    """Keep the highest-ranked entries that fit ``budget`` chars."""
+    if block.size <= budget:
+        lines = [line for e in block.entries for line in e.lines]
+        if block.kind == "inline":
+            lines = [", ".join(lines)]
+        return block.head + lines + block.tail, 0
+
+    newest_first = block.heading in _NEWEST_FIRST
+    ranked = sorted(
+        block.entries,
+        key=lambda e: (
+            -e.score,
+            e.depth,
+            -e.position if newest_first else e.position,
+        ),
+    )
+    room = budget - sum(len(line) + 1 for line in block.head + block.tail) - 40
+    kept: list[_Entry] = []
+    for entry in ranked:
+        if entry.size <= room:
+            kept.append(entry)
+            room -= entry.size
+    kept.sort(key=lambda e: e.position)
+    elided = len(block.entries) - len(kept)
+
+    lines = [line for e in kept for line in e.lines]
+    if block.kind == "inline":
+        lines = [", ".join(lines + [_elided_marker(block, elided)])]
+    else:
+        lines.append(_elided_marker(block, elided))
+    return block.head + lines + block.tail, elided
+
+
+def budget_structure(
+    text: str, focus: ContextFocus, budget_tokens: int
+) -> tuple[str, ElisionReport]:
+    """Fit structure.md into ``budget_tokens``, ranking entries by relevance.
+
+    Each section gets a share of the budget (shares not needed by small
+    sections are handed to the larger ones). Within a section, entries that
+    touch recently changed files rank highest, then files the plan references,
+    then entries matching words from the issue. Everything that does not fit
+    is collapsed into a count.
+    """
+    budget = budget_tokens * _CHARS_PER_TOKEN
+    preamble, blocks = _parse_blocks(text)
+    total = sum(len(b.entries) for b in blocks)
+    if len(text) <= budget:
+        return text, ElisionReport(total=total)
+
+    changed_stems = _file_stems(focus.changed)
+    planned_stems = _file_stems(focus.planned)
+    for block in blocks:
+        for entry in block.entries:
+            entry.score = _score(entry, focus, changed_stems, planned_stems)
+
+    # Allocate: fixed blocks and blocks within their share keep everything,
+    # the rest split the remainder
+    room = budget - sum(len(line) + 1 for line in preamble)
+    default_share = 1 / max(len(blocks), 1)
+    shares = {b.heading: _SECTION_SHARES.get(b.heading, default_share) for b in blocks}
+    allot: dict[str, int] = {}
+    for b in blocks:
+        if b.heading in _FIXED_SECTIONS:
+            allot[b.heading] = b.size
+            room -= b.size
+    over = [b for b in blocks if b.heading not in allot]
+    while over:
+        weight = sum(shares[b.heading] for b in over) or 1.0
+        fits = [b for b in over if b.size <= room * shares[b.heading] / weight]
+        if not fits:
+            for b in over:
+                allot[b.heading] = int(room * shares[b.heading] / weight)
+            break
+        for b in fits:
+            allot[b.heading] = b.size
+            room -= b.size
+            over.remove(b)
+
+    out = list(preamble)
+    report = ElisionReport(total=total)
+    for block in blocks:
+        lines, elided = _trim_block(block, allot[block.heading])
+        out.extend(lines)
+        report.entries += elided
+    result = "\n".join(out)
+    report.tokens = estimate_tokens(max(len(text) - len(result), 0))
+    return result, report
 
 
 def init_architecture(project_dir: Path) -> None:
@@ -135,21 +657,38 @@ def init_architecture(project_dir: Path) -> None:
     arch_file.write_text(template, encoding="utf-8")
 
 
-def read_context(project_dir: Path) -> str:
-    """Read all context files and return combined content for prompt injection."""
+def read_context(
+    project_dir: Path,
+    focus: ContextFocus | None = None,
+    budget_tokens: int = STRUCTURE_TOKEN_BUDGET,
+) -> str:
+    """Read all context files and return combined content for prompt injection.
+
+    structure.md is cut down to ``budget_tokens`` (0 = unlimited): entries are
+    ranked by ``focus`` and the rest collapsed into counts, with a note on how
+    much was elided. The file on disk always keeps the full listing.
+    """
     ctx_dir = project_dir / ".workflow" / "context"
     if not ctx_dir.exists():
         return ""
 
     parts: list[str] = []
 
-    structure = ctx_dir / "structure.md"
-    if structure.exists():
-        parts.append(structure.read_text(encoding="utf-8", errors="replace"))
-
-    architecture = ctx_dir / "architecture.md"
-    if architecture.exists():
-        parts.append(architecture.read_text(encoding="utf-8", errors="replace"))
+    text = read_cached(ctx_dir / "structure.md")
+    if text is not None:
+        if budget_tokens > 0:
+            text, report = budget_structure(text, focus or ContextFocus(), budget_tokens)
+            if report.entries:
+                text += (
+                    f"\n_Context budget: {report.entries} of {report.total} entries "
+                    f"(~{report.tokens:,} tokens) elided, least relevant first. "
+                    f"Full listing: .workflow/context/structure.md_\n"
+                )
+        parts.append(text)
+
+    architecture = read_cached(ctx_dir / "architecture.md")
+    if architecture is not None:
+        parts.append(architecture)
 
     return "\n\n---\n\n".join(parts)
 
@@ -157,7 +696,7 @@ def read_context(project_dir: Path) -> str:
 # --- Internal helpers ---
 
 
-def _detect_tech_stack(project_dir: Path) -> dict[str, str]:
+def _detect_tech_stack(project_dir: Path, index: FileIndex) -> dict[str, str]:
     """Detect tech stack from config files."""
     tech: dict[str, str] = {}
 
@@ -171,7 +710,6 @@ def _detect_tech_stack(project_dir: Path) -> dict[str, str]:
         pkg = angular_json.parent / "package.json"
         if pkg.exists():
             try:
-                import json
                 data = json.loads(pkg.read_text(encoding="utf-8"))
                 deps = {**data.get("dependencies", {}), **data.get("devDependencies", {})}
                 if "@angular/core" in deps:
@@ -193,173 +731,37 @@ def _detect_tech_stack(project_dir: Path) -> dict[str, str]:
             tech["Backend"] = "Spring Boot (Gradle)"
 
     # Database
-    for migration_dir in project_dir.rglob("migration"):
-        if migration_dir.is_dir() and any(migration_dir.glob("V*.sql")):
-            tech["Database"] = "PostgreSQL (Flyway migrations)"
-            break
+    if index.in_dir("migration", "V*.sql"):
+        tech["Database"] = "PostgreSQL (Flyway migrations)"
 
     return tech
 
 
-def _generate_tree(root: Path, max_depth: int = 4) -> list[str]:
-    """Generate a filtered directory tree."""
-    lines: list[str] = [root.name + "/"]
-    _tree_recurse(root, "", max_depth, 0, lines)
+def _generate_tree(index: FileIndex, max_depth: int = 4) -> list[str]:
+    """Generate a filtered directory tree from the file index."""
+    lines: list[str] = [index.root.name + "/"]
+    _tree_recurse(index, "", "", max_depth, 0, lines)
     return lines
 
 
 def _tree_recurse(
-    directory: Path, prefix: str, max_depth: int, depth: int, lines: list[str]
+    index: FileIndex, rel_dir: str, prefix: str, max_depth: int, depth: int,
+    lines: list[str],
 ) -> None:
     if depth >= max_depth:
         return
 
-    try:
-        entries = sorted(directory.iterdir(), key=lambda p: (not p.is_dir(), p.name))
-    except PermissionError:
-        return
-
-    # Filter out skip directories and hidden files (except config files)
-    filtered = [
-        e for e in entries
-        if e.name not in _SKIP_DIRS
-        and not (e.name.startswith(".") and e.is_dir() and e.name != ".workflow")
-    ]
+    # Skip directories and hidden directories are already pruned by the walk
+    entries = index.children.get(rel_dir, [])
 
-    for i, entry in enumerate(filtered):
-        is_last = i == len(filtered) - 1
+    for i, (name, is_dir) in enumerate(entries):
+        is_last = i == len(entries) - 1
         connector = "`-- " if is_last else "|-- "
         child_prefix = prefix + ("    " if is_last else "|   ")
 
-        if entry.is_dir():
-            lines.append(f"{prefix}{connector}{entry.name}/")
-            _tree_recurse(entry, child_prefix, max_depth, depth + 1, lines)
+        if is_dir:
+            lines.append(f"{prefix}{connector}{name}/")
+            child = f"{rel_dir}/{name}" if rel_dir else name
+            _tree_recurse(index, child, child_prefix, max_depth, depth + 1, lines)
         else:
-            lines.append(f"{prefix}{connector}{entry.name}")
-
-
-def _collect_inventory(project_dir: Path) -> dict[str, list[str]]:
-    """Collect key files by category."""
-    inventory: dict[str, list[str]] = {}
-
-    patterns = {
-        "Backend Entities": [_BACKEND_ENTITY, _BACKEND_MODEL],
-        "Backend Controllers": [_BACKEND_CONTROLLER, _BACKEND_RESOURCE],
-        "Backend Services": [_BACKEND_SERVICE],
-        "Backend Repositories": [_BACKEND_REPOSITORY],
-        "Backend DTOs": [_BACKEND_DTO],
-        "Database Migrations": [_BACKEND_MIGRATION],
-        "Frontend Components": [_FRONTEND_COMPONENT],
-        "Frontend Services": [_FRONTEND_SERVICE],
-        "Frontend Models": [_FRONTEND_MODEL],
-    }
-
-    for category, globs in patterns.items():
-        files: list[str] = []
-        for pattern in globs:
-            for f in project_dir.rglob(pattern.replace("**/", "")):
-                if not any(skip in str(f) for skip in _SKIP_DIRS):
-                    rel = f.relative_to(project_dir)
-                    files.append(str(rel))
-        if files:
-            inventory[category] = sorted(files)
-
-    return inventory
-
-
-def _parse_java_entities(project_dir: Path) -> dict[str, list[str]]:
-    """Quick-parse Java entity files for field names."""
-    entities: dict[str, list[str]] = {}
-
-    for pattern in [_BACKEND_ENTITY, _BACKEND_MODEL]:
-        for f in project_dir.rglob(pattern.replace("**/", "")):
-            if any(skip in str(f) for skip in _SKIP_DIRS):
-                continue
-            if "Test" in f.name:
-                continue
-
-            entity_name = f.stem
-            fields: list[str] = []
-
-            try:
-                content = f.read_text(encoding="utf-8", errors="replace")
-                for line in content.splitlines():
-                    line = line.strip()
-                    # Match: private Type fieldName; or private Type fieldName =
-                    if line.startswith("private ") and (";" in line or "=" in line):
-                        # Skip static fields
-                        if "static " in line:
-                            continue
-                        parts = line.split()
-                        if len(parts) >= 3:
-                            field_name = parts[2].rstrip(";").rstrip("=").strip()
-                            field_type = parts[1]
-                            fields.append(f"{field_name}:{field_type}")
-            except Exception:
-                continue
-
-            if fields:
-                entities[entity_name] = fields
-
-    return entities
-
-
-def _list_frontend_components(project_dir: Path) -> list[str]:
-    """List Angular component selectors or file names."""
-    components: list[str] = []
-
-    for f in project_dir.rglob("*.component.ts"):
-        if any(skip in str(f) for skip in _SKIP_DIRS):
-            continue
-        if ".spec." in f.name:
-            continue
-        rel = f.relative_to(project_dir)
-        components.append(str(rel))
-
-    return sorted(components)
-
-
-def _find_api_endpoints(project_dir: Path) -> list[str]:
-    """Find REST endpoints grouped by controller."""
-    by_controller: dict[str, list[str]] = {}
-
-    try:
-        result = subprocess.run(
-            ["grep", "-rn", "--include=*.java",
-             "-E", "@(Request|Get|Post|Put|Delete|Patch)Mapping"],
-            capture_output=True, text=True,
-            cwd=str(project_dir), timeout=10,
-        )
-        if result.returncode == 0:
-            for line in result.stdout.splitlines():
-                parts = line.split(":", 2)
-                if len(parts) >= 3:
-                    # Extract controller name from path
-                    rel_path = parts[0]
-                    controller = Path(rel_path).stem
-                    annotation = parts[2].strip()
-                    by_controller.setdefault(controller, []).append(annotation)
-    except Exception:
-        pass
-
-    # Format as compact grouped output
-    endpoints: list[str] = []
-    for controller, annotations in sorted(by_controller.items()):
-        methods = []
-        for a in annotations:
-            # Extract just the HTTP method and path
-            a = a.strip()
-            if "@RequestMapping" in a:
-                # Class-level base path
-                endpoints.append(f"**{controller}** {a}")
-            else:
-                methods.append(a)
-        if methods:
-            if not any(f"**{controller}**" in e for e in endpoints):
-                endpoints.append(f"**{controller}**")
-            for m in methods[:8]:  # limit per controller
-                endpoints.append(f"  {m}")
-            if len(methods) > 8:
-                endpoints.append(f"  ... +{len(methods) - 8} more")
-
-    return endpoints
+            lines.append(f"{prefix}{connector}{name}")
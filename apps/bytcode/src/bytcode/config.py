@@ -15,6 +15,19 @@ class Scope(Enum):
     BACKEND_ONLY = "backend-only"
 
 
+class PromptLayout(Enum):
+    """Section order of the phase prompt.
+
+    CLASSIC: header first, user feedback right after it (maximum visibility).
+    CACHE_FRIENDLY: most stable sections first, volatile ones (state, extra
+    context, feedback, retry) last, so retries and sibling phases share a
+    long identical prefix for provider-side prompt caching.
+    """
+
+    CLASSIC = "classic"
+    CACHE_FRIENDLY = "cache-friendly"
+
+
 COVERAGE_OPTIONS: list[int] = [50, 70, 85, 95]
 
 
@@ -28,6 +41,7 @@ class WorkflowConfig:
     target_coverage: int = 85
     ui_designer: bool = True
     scope: Scope = Scope.FULL_STACK
+    prompt_layout: PromptLayout = PromptLayout.CLASSIC
 
 
 @dataclass
@@ -51,6 +65,8 @@ class Phase:
     tools: list[str] = field(default_factory=list)  # --tools: restricts available tools
     model: str = ""       # "" = default (opus), or "sonnet", "haiku"
     max_turns: int = 0    # 0 = no limit, >0 = --max-turns safety cap
+    pre_read: str = "full"  # "full" = file contents, "diff" = git diff hunks + outlines
+    diff_context: int = 3   # context lines around hunks in "diff" pre-read mode
 
 
 PHASES: list[Phase] = [
@@ -131,6 +147,7 @@ PHASES: list[Phase] = [
         tools=["Read", "Write", "Edit", "Bash", "Glob", "Grep"],
         model="sonnet",    # audit is read-heavy, pattern-based
         max_turns=30,
+        pre_read="diff",   # the change set, not whole files
     ),
     Phase(
         number=6,
@@ -143,6 +160,7 @@ PHASES: list[Phase] = [
         tools=["Read", "Write", "Bash", "Glob", "Grep"],
         model="sonnet",    # review is read-only analysis (Write/Bash for spec + state output)
         max_turns=25,
+        pre_read="diff",   # the change set, not whole files
     ),
     Phase(
         number=7,
@@ -155,6 +173,7 @@ PHASES: list[Phase] = [
         tools=["Read", "Write", "Bash", "Glob", "Grep"],
         model="sonnet",    # summary writing
         max_turns=20,
+        pre_read="diff",   # the change set, not whole files
     ),
     Phase(
         number=8,
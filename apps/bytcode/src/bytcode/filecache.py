@@ -0,0 +1,81 @@
+"""Process-wide cache of parsed file contents for prompt assembly.
+
+Entries are keyed by (path, parser) and invalidated by mtime/size, so
+retries and rollbacks rebuild prompts without re-reading (or re-parsing)
+files that did not change. Thread-safe: prompt inputs are loaded from
+worker threads concurrently.
+"""
+
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, TypeVar
+
+T = TypeVar("T")
+
+# Max cached entries (pre-read source files make up most of them)
+_MAX_ENTRIES = 1024
+
+
+def _identity(text: str) -> str:
+    return text
+
+
+class FileCache:
+    """LRU of ``parse(file content)`` results, validated by stat()."""
+
+    def __init__(self, max_entries: int = _MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[str, Callable], tuple[int, int, object]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def read(
+        self, path: Path, parse: Callable[[str], T] = _identity
+    ) -> T | None:
+        """Return ``parse(content)`` of path, or None if it can't be read.
+
+        ``parse`` is part of the key, so pass a module-level function (not a
+        lambda created per call) to get cache hits.
+        """
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        key = (str(path), parse)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]  # type: ignore[return-value]
+            self.misses += 1
+
+        try:
+            value = parse(path.read_text(encoding="utf-8", errors="replace"))
+        except OSError:
+            return None
+
+        with self._lock:
+            self._entries[key] = (st.st_mtime_ns, st.st_size, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+
+# Shared by prompts.py and codebase.read_context
+INPUT_CACHE = FileCache()
+
+
+def read_cached(path: Path, parse: Callable[[str], T] = _identity) -> T | None:
+    """Read (and parse) a file through the shared input cache."""
+    return INPUT_CACHE.read(path, parse)
@@ -0,0 +1,319 @@
+"""Git queries for bytcode, cached per repository state.
+
+One GitService per project serves changed files, diffs, file listings and
+branch lists to the prompt builder, codebase indexer, orchestrator and UI.
+Read-only query results are cached under a cheap state key (HEAD, its ref
+and the git index mtime, read from the git directories that
+``git rev-parse`` reports, so worktrees, submodules and subdirectory
+projects work); identical concurrent queries share one git process.
+Working-tree edits do not always touch the index, so callers invalidate()
+after anything may have changed files (e.g. an agent run).
+"""
+
+import asyncio
+import re
+import subprocess
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, TypeVar
+
+T = TypeVar("T")
+
+# Timeout for a single git invocation
+_TIMEOUT_S = 10.0
+# ls-files on large monorepos can take a while
+_LIST_TIMEOUT_S = 30.0
+
+
+@dataclass
+class GitResult:
+    returncode: int
+    stdout: str
+    stderr: str
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0
+
+
+@dataclass(frozen=True)
+class GitDirs:
+    """Where a checkout keeps its git state.
+
+    git_dir holds HEAD and the index; common_dir holds refs and packed-refs.
+    They differ in linked worktrees; submodules and projects in a subdirectory
+    of the repository resolve like any other checkout.
+    """
+
+    git_dir: Path
+    common_dir: Path
+
+
+def state_key(dirs: GitDirs) -> tuple | None:
+    """Cheap cache key for git queries: HEAD, its ref and the index mtime."""
+    try:
+        head = (dirs.git_dir / "HEAD").read_text(encoding="utf-8").strip()
+    except OSError:
+        return None
+    ref_mtime = 0
+    if head.startswith("ref: "):
+        for ref_file in (dirs.common_dir / head[5:], dirs.common_dir / "packed-refs"):
+            try:
+                ref_mtime = ref_file.stat().st_mtime_ns
+                break
+            except OSError:
+                continue
+    try:
+        index_mtime = (dirs.git_dir / "index").stat().st_mtime_ns
+    except OSError:
+        index_mtime = 0
+    return (head, ref_mtime, index_mtime)
+
+
+class GitService:
+    """Cached, thread-safe git queries for one project directory."""
+
+    def __init__(self, project_dir: Path):
+        self.project_dir = project_dir
+        self._dirs: GitDirs | None = None
+        self._dirs_resolved = False
+        self._key: tuple | None = None
+        self._cache: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+        # One lock per git command (not per argument list), so this stays small
+        self._query_locks: dict[str, threading.Lock] = {}
+
+    # --- Running git ---
+
+    def run(self, *args: str, timeout: float = _TIMEOUT_S) -> GitResult:
+        """Run git synchronously (uncached)."""
+        try:
+            result = subprocess.run(
+                ["git", *args], capture_output=True, cwd=str(self.project_dir),
+                timeout=timeout,
+            )
+        except (OSError, subprocess.TimeoutExpired) as e:
+            return GitResult(-1, "", str(e))
+        return GitResult(
+            result.returncode,
+            result.stdout.decode("utf-8", errors="replace"),
+            result.stderr.decode("utf-8", errors="replace"),
+        )
+
+    async def arun(self, *args: str, timeout: float = _TIMEOUT_S) -> GitResult:
+        """Run git as an asyncio subprocess (uncached, e.g. for checkout)."""
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                "git", *args, cwd=str(self.project_dir),
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+        except OSError as e:
+            return GitResult(-1, "", str(e))
+        try:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            return GitResult(-1, "", f"git {args[0]} timed out")
+        return GitResult(
+            proc.returncode if proc.returncode is not None else -1,
+            stdout.decode("utf-8", errors="replace"),
+            stderr.decode("utf-8", errors="replace"),
+        )
+
+    # --- Cache ---
+
+    def git_dirs(self) -> GitDirs | None:
+        """The checkout's git directories (resolved once), None if not in a repo."""
+        if not self._dirs_resolved:
+            result = self.run("rev-parse", "--absolute-git-dir", "--git-common-dir")
+            lines = result.stdout.splitlines() if result.ok else []
+            if len(lines) == 2:
+                # --git-common-dir may be relative to the working directory
+                common_dir = Path(lines[1])
+                if not common_dir.is_absolute():
+                    common_dir = (self.project_dir / common_dir).resolve()
+                self._dirs = GitDirs(Path(lines[0]), common_dir)
+            self._dirs_resolved = True
+        return self._dirs
+
+    def invalidate(self) -> None:
+        """Drop all cached results (the working tree may have changed)."""
+        with self._lock:
+            self._cache.clear()
+            if self._dirs is None:
+                self._dirs_resolved = False  # the project may be a checkout by now
+
+    def _cached(self, query: tuple, compute: Callable[[], T]) -> T:
+        dirs = self.git_dirs()
+        key = state_key(dirs) if dirs else None
+        if key is None:
+            return compute()  # no repository state to validate a cached result
+        with self._lock:
+            if key != self._key:
+                self._key = key
+                self._cache.clear()
+            if query in self._cache:
+                return self._cache[query]  # type: ignore[return-value]
+            query_lock = self._query_locks.setdefault(query[0], threading.Lock())
+
+        # One git process per command; concurrent callers wait for its result
+        with query_lock:
+            with self._lock:
+                if query in self._cache and self._key == key:
+                    return self._cache[query]  # type: ignore[return-value]
+            value = compute()
+            with self._lock:
+                if self._key == key:
+                    self._cache[query] = value
+        return value
+
+    # --- Queries ---
+
+    def is_repo(self) -> bool:
+        return self.git_dirs() is not None
+
+    def merge_base(self, base_branch: str) -> str:
+        """Branch point of HEAD with base_branch (base_branch if unknown)."""
+        def compute() -> str:
+            result = self.run("merge-base", base_branch, "HEAD")
+            return result.stdout.strip() if result.ok and result.stdout.strip() else base_branch
+        return self._cached(("merge-base", base_branch), compute)
+
+    def diff_stat(self, base_branch: str) -> dict[str, int]:
+        """Lines added + deleted per tracked file, working tree vs. branch point.
+
+        Covers committed and uncommitted changes in one ``git diff --numstat``.
+        Like ls-files, paths are relative to (and limited to) the project
+        directory, which may be a subdirectory of the repository.
+        """
+        def compute() -> dict[str, int]:
+            result = self.run(
+                "diff", "--numstat", "-z", "--relative", self.merge_base(base_branch)
+            )
+            if not result.ok:
+                return {}
+            stats: dict[str, int] = {}
+            items = result.stdout.split("\0")
+            i = 0
+            while i < len(items):
+                fields = items[i].split("\t")
+                i += 1
+                if len(fields) < 3:
+                    continue
+                added, deleted, path = fields[0], fields[1], fields[2]
+                if not path:  # rename: "<a>\t<d>\t\0<old>\0<new>\0"
+                    path = items[i + 1] if i + 1 < len(items) else ""
+                    i += 2
+                if path:
+                    # Binary files report "-" for both counts
+                    stats[path] = int(added) + int(deleted) if added.isdigit() else 0
+            return stats
+        return self._cached(("diff-stat", base_branch), compute)
+
+    def untracked(self) -> list[str]:
+        """Untracked, non-ignored files."""
+        def compute() -> list[str]:
+            result = self.run("ls-files", "-z", "--others", "--exclude-standard")
+            return [f for f in result.stdout.split("\0") if f] if result.ok else []
+        return self._cached(("untracked",), compute)
+
+    def changed_files(self, base_branch: str) -> list[str]:
+        """Files changed on this branch: committed, uncommitted and new.
+
+        Unlike ``git diff base...HEAD`` (committed changes only), this compares
+        the working tree with the branch point and adds untracked files, so
+        work an agent has not committed yet is included.
+        """
+        changed = list(self.diff_stat(base_branch))
+        seen = set(changed)
+        changed.extend(f for f in self.untracked() if f not in seen)
+        return changed
+
+    def diff_hunks(self, base_branch: str, context_lines: int = 3) -> dict[str, str]:
+        """Per-file diff hunks (from the first ``@@``), working tree vs. branch point."""
+        def compute() -> dict[str, str]:
+            result = self.run(
+                "diff", "--no-color", "--no-ext-diff", "--relative", f"-U{context_lines}",
+                self.merge_base(base_branch),
+            )
+            return _split_diff(result.stdout) if result.ok else {}
+        return self._cached(("diff-hunks", base_branch, context_lines), compute)
+
+    def ls_files(self) -> list[str] | None:
+        """Tracked + untracked (non-ignored) files minus deleted ones, sorted.
+
+        None if the project is not a git checkout or git failed.
+        """
+        if not self.is_repo():
+            return None
+
+        def compute() -> list[str] | None:
+            result = self.run(
+                "ls-files", "-z", "-t", "-c", "-o", "-d", "--exclude-standard",
+                timeout=_LIST_TIMEOUT_S,
+            )
+            if not result.ok:
+                return None
+            files: set[str] = set()
+            deleted: set[str] = set()
+            for item in result.stdout.split("\0"):
+                tag, _, path = item.partition(" ")
+                if not path:
+                    continue
+                if tag == "R":
+                    deleted.add(path)
+                else:
+                    files.add(path)
+            return sorted(files - deleted)
+        return self._cached(("ls-files",), compute)
+
+    def remote_branches(self) -> list[str]:
+        """Remote branch names without the remote prefix, e.g. ["main", "develop"]."""
+        def compute() -> list[str]:
+            result = self.run("branch", "-r", "--no-color")
+            if not result.ok:
+                return []
+            branches: list[str] = []
+            for line in result.stdout.splitlines():
+                name = line.strip()
+                if not name or "HEAD" in name:
+                    continue
+                if "/" in name:
+                    name = name.split("/", 1)[1]
+                if name not in branches:
+                    branches.append(name)
+            return branches
+        return self._cached(("remote-branches",), compute)
+
+    # --- Async access (queries run in a worker thread, sharing the cache) ---
+
+    async def remote_branches_async(self) -> list[str]:
+        return await asyncio.to_thread(self.remote_branches)
+
+
+def _split_diff(diff: str) -> dict[str, str]:
+    hunks: dict[str, str] = {}
+    for chunk in re.split(r"^(?=diff --git )", diff, flags=re.MULTILINE):
+        header, _, body = chunk.partition("\n@@")
+        match = re.search(r"^\+\+\+ b/(.+)$", header, re.MULTILINE) or re.search(
+            r"^--- a/(.+)$", header, re.MULTILINE
+        )
+        if match and body:
+            hunks[match.group(1)] = "@@" + body.rstrip("\n")
+    return hunks
+
+
+_SERVICES: dict[Path, GitService] = {}
+_SERVICES_LOCK = threading.Lock()
+
+
+def git_service(project_dir: Path) -> GitService:
+    """The shared GitService for a project directory."""
+    with _SERVICES_LOCK:
+        service = _SERVICES.get(project_dir)
+        if service is None:
+            service = _SERVICES[project_dir] = GitService(project_dir)
+        return service
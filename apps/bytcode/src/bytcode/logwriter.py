@@ -0,0 +1,177 @@
+"""Background, batched writer for phase log files.
+
+PhaseLog receives one write per stream-json event on the thread that parses
+the claude stream; verbose phases emit thousands of them, some several MB.
+LogWriter hands each write to a queue bounded by the characters it holds
+(a few multi-MB tool results weigh more than thousands of short lines) and
+a writer thread batches them into one write+flush per interval (or per size
+threshold), with an fsync on close. If the queue is full, non-blocking
+writes are dropped and counted instead of stalling the stream parser.
+
+Where batches go is up to the sink: TextSink appends to a plain file,
+rawlog.CompressedLogSink writes compressed, indexed segments.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Protocol
+
+# Max pending characters before non-blocking writes are dropped
+_MAX_QUEUE_CHARS = 32 * 1024 * 1024
+# Flush buffered writes at least this often (seconds) ...
+_FLUSH_INTERVAL_S = 0.5
+# ... or as soon as this many characters are buffered
+_FLUSH_CHARS = 256 * 1024
+
+
+class LogSink(Protocol):
+    """Destination of a LogWriter; only ever called from its writer thread."""
+
+    name: str
+
+    def write_batch(self, items: list[str]) -> None: ...
+
+    def close(self, fsync: bool) -> None: ...
+
+
+class TextSink:
+    """Plain text file; one write + flush per batch."""
+
+    def __init__(self, path: Path, mode: str = "w"):
+        self.name = path.name
+        self._file = open(path, mode, encoding="utf-8")
+
+    def write_batch(self, items: list[str]) -> None:
+        self._file.write("".join(items))
+        self._file.flush()
+
+    def close(self, fsync: bool) -> None:
+        try:
+            if fsync:
+                os.fsync(self._file.fileno())
+        except OSError:
+            pass
+        finally:
+            self._file.close()
+
+
+class LogWriter:
+    """Write text to a sink from a background thread."""
+
+    def __init__(
+        self,
+        sink: LogSink,
+        *,
+        max_queue_chars: int = _MAX_QUEUE_CHARS,
+        flush_interval: float = _FLUSH_INTERVAL_S,
+        flush_chars: int = _FLUSH_CHARS,
+    ):
+        self.sink = sink
+        self.max_queue_chars = max_queue_chars
+        self.flush_interval = flush_interval
+        self.flush_chars = flush_chars
+        # Metrics (approximate while running, exact after close)
+        self.written = 0
+        self.dropped = 0
+        self.dropped_chars = 0
+        self.flushes = 0
+        self.high_water = 0  # most characters queued at once
+        self._pending: deque[str] = deque()
+        self._pending_chars = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name=f"log-writer-{sink.name}", daemon=True
+        )
+        self._thread.start()
+
+    def write(self, text: str, *, block: bool = False) -> bool:
+        """Queue text for writing. False if dropped (queue full or closed).
+
+        Use block=True for lines that must not be lost (headers, results).
+        A single write larger than the limit is accepted once the queue is empty.
+        """
+        size = len(text)
+        with self._cond:
+            while (
+                not self._closed
+                and self._pending
+                and self._pending_chars + size > self.max_queue_chars
+            ):
+                if not block:
+                    self.dropped += 1
+                    self.dropped_chars += size
+                    return False
+                self._cond.wait()
+            if self._closed:
+                return False
+            self._pending.append(text)
+            self._pending_chars += size
+            self.high_water = max(self.high_water, self._pending_chars)
+            self._cond.notify_all()
+        return True
+
+    def close(self, fsync: bool = True) -> None:
+        """Write everything queued, then close (and fsync) the sink."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        self.sink.close(fsync)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "written": self.written,
+            "dropped": self.dropped,
+            "dropped_chars": self.dropped_chars,
+            "flushes": self.flushes,
+            "queue_high_water_chars": self.high_water,
+        }
+
+    def _run(self) -> None:
+        buffer: list[str] = []
+        size = 0
+        last_flush = time.monotonic()
+        while True:
+            with self._cond:
+                if not self._pending and not self._closed:
+                    timeout = None  # nothing buffered: sleep until the next write
+                    if buffer:
+                        timeout = max(
+                            0.0, self.flush_interval - (time.monotonic() - last_flush)
+                        )
+                    self._cond.wait(timeout)
+                items = list(self._pending)
+                self._pending.clear()
+                self._pending_chars = 0
+                closed = self._closed
+                self._cond.notify_all()  # wake writers blocked on a full queue
+            buffer.extend(items)
+            size += sum(len(item) for item in items)
+            if closed:
+                break
+            if buffer and (
+                size >= self.flush_chars
+                or time.monotonic() - last_flush >= self.flush_interval
+            ):
+                self._flush(buffer)
+                buffer, size = [], 0
+                last_flush = time.monotonic()
+        self._flush(buffer)
+
+    def _flush(self, buffer: list[str]) -> None:
+        if not buffer:
+            return
+        try:
+            self.sink.write_batch(buffer)
+        except OSError:
+            self.dropped += len(buffer)
+            self.dropped_chars += sum(len(text) for text in buffer)
+            return
+        self.written += len(buffer)
+        self.flushes += 1
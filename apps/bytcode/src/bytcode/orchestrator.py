@@ -1,42 +1,35 @@
 """Phase-loop orchestrator: runs Claude per phase with streaming output."""
 
 import asyncio
+import codecs
 import io
 import json
 import time
+from collections import deque
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from enum import Enum
 from pathlib import Path
-from typing import Callable, TextIO
+from typing import Callable
 
-from .codebase import init_architecture, write_structure
+from rich.markup import escape
+
+from .codebase import (
+    estimate_tokens,
+    init_architecture,
+    invalidate_file_index,
+    write_structure,
+)
 from .config import PHASES, Phase, PhaseType, WorkflowConfig
-from .prompts import build_prompt
-from .verify import verify_phase
-
-import re
-
-
-def _extract_section(markdown: str, heading: str) -> str:
-    """Extract content under a ## heading, stopping at the next ## heading."""
-    pattern = rf"^##\s+{re.escape(heading)}\s*$"
-    lines = markdown.splitlines()
-    start = None
-    for i, line in enumerate(lines):
-        if re.match(pattern, line, re.IGNORECASE):
-            start = i + 1
-            break
-    if start is None:
-        return ""
-    result: list[str] = []
-    for line in lines[start:]:
-        if line.startswith("## "):
-            break
-        result.append(line)
-    # Strip leading/trailing blank lines
-    text = "\n".join(result).strip()
-    return text
+from .gitservice import git_service
+from .logwriter import LogWriter, TextSink
+from .prompts import PromptSizes, RetryInfo, build_prompt_async, build_resume_prompt
+from .rawlog import CompressedLogSink, remove_raw_logs
+from .specs import extract_section
+from .streamjson import event_type as sniff_event_type
+from .streamjson import loads as loads_event
+from .verify import verify_phase_async
+from .watcher import StructureWatcher
 
 
 class PhaseStatus(Enum):
@@ -81,66 +74,111 @@ LiveLogCallback = Callable[[str], None]     # detailed tool activity for live-lo
 SummaryCallback = Callable[[str, str], None]  # (title, markdown) for summary panel
 
 
+# Stream-json event types _process_stream_event acts on
+_HANDLED_EVENTS = frozenset({"system", "assistant", "result"})
+# claude stderr: read size, and max kept length of one line
+_STDERR_CHUNK = 64 * 1024
+_STDERR_LINE_CHARS = 4_000
+
+
 class PhaseLog:
-    """Manages transcript (.md) and raw (.jsonl) log files for a phase."""
+    """Manages the transcript (.md) and raw stream logs for a phase.
+
+    Writes go through background LogWriters (batched, fsynced on close), so
+    logging never blocks the stream parser. Stream events may be dropped if
+    a writer's queue is full; headers, results and verdicts never are.
+    Raw stream-json lines are stored compressed, one set of segments per
+    attempt, with an offset index (see rawlog.py).
+    """
 
     def __init__(self, logs_dir: Path, phase_num: int, agent_name: str):
-        self.transcript_path = logs_dir / f"phase-{phase_num}-{agent_name}.md"
-        self.jsonl_path = logs_dir / f"phase-{phase_num}-{agent_name}.jsonl"
-        self._transcript: TextIO | None = None
-        self._jsonl: TextIO | None = None
+        self.logs_dir = logs_dir
+        self.raw_stem = f"phase-{phase_num}-{agent_name}"
+        self.transcript_path = logs_dir / f"{self.raw_stem}.md"
+        self._transcript: LogWriter | None = None
+        self._jsonl: LogWriter | None = None
 
     def open(self, attempt: int) -> None:
-        """Open log files. Append mode so retries accumulate."""
+        """Open log files. The transcript appends so retries accumulate."""
         mode = "a" if attempt > 1 else "w"
-        self._transcript = open(self.transcript_path, mode, encoding="utf-8")
-        self._jsonl = open(self.jsonl_path, mode, encoding="utf-8")
+        if attempt == 1:
+            remove_raw_logs(self.logs_dir, self.raw_stem)
+        self._transcript = LogWriter(TextSink(self.transcript_path, mode))
+        self._jsonl = LogWriter(CompressedLogSink(self.logs_dir, self.raw_stem, attempt))
         if attempt > 1:
-            self._transcript.write(f"\n\n---\n\n## Attempt {attempt}\n\n")
+            self._transcript.write(f"\n\n---\n\n## Attempt {attempt}\n\n", block=True)
 
-    def close(self) -> None:
-        if self._transcript:
-            self._transcript.close()
-            self._transcript = None
+    def close(self) -> dict[str, dict[str, int]]:
+        """Close this attempt's log files; returns their writer metrics.
+
+        Metrics per file: writes written/dropped, flushes, queue high water.
+        """
         if self._jsonl:
             self._jsonl.close()
-            self._jsonl = None
+        if self._transcript:
+            dropped = self._transcript.dropped + (self._jsonl.dropped if self._jsonl else 0)
+            if dropped:
+                self._transcript.write(
+                    f"\n_{dropped} log writes dropped (writer queue full)_\n", block=True
+                )
+            self._transcript.close()
+        stats = {
+            name: writer.stats()
+            for name, writer in (("transcript", self._transcript), ("jsonl", self._jsonl))
+            if writer
+        }
+        self._transcript = None
+        self._jsonl = None
+        return stats
 
     def write_raw(self, line: str) -> None:
-        """Write a raw stream-json line to the JSONL file."""
+        """Write a raw stream-json line to this attempt's compressed log."""
         if self._jsonl:
             self._jsonl.write(line + "\n")
-            self._jsonl.flush()
 
     def write_transcript(self, text: str) -> None:
         """Write a line to the human-readable transcript."""
         if self._transcript:
             self._transcript.write(text + "\n")
-            self._transcript.flush()
 
     def write_header(
-        self, phase_num: int, phase_name: str, agent: str, attempt: int
+        self,
+        phase_num: int,
+        phase_name: str,
+        agent: str,
+        attempt: int,
+        prompt_sizes: PromptSizes | None = None,
+        resumed_session: str | None = None,
     ) -> None:
         if not self._transcript:
             return
         ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self._transcript.write(
+        lines = [
             f"# Phase {phase_num}: {phase_name}\n"
             f"Agent: {agent}\n"
             f"Started: {ts}\n"
-            f"Attempt: {attempt}\n\n"
-        )
-        self._transcript.flush()
+            f"Attempt: {attempt}\n"
+        ]
+        if resumed_session:
+            lines.append(f"Resumes session: {resumed_session}\n")
+        if prompt_sizes:
+            total = prompt_sizes.total
+            lines.append(f"Prompt: {total:,} chars (~{estimate_tokens(total):,} tokens)\n")
+            for name, chars in prompt_sizes.chars.items():
+                if chars:
+                    lines.append(
+                        f"  {name}: {chars:,} chars (~{estimate_tokens(chars):,} tokens)\n"
+                    )
+        lines.append("\n")
+        self._transcript.write("".join(lines), block=True)
 
     def write_tool_call(self, tool: str, activity: str) -> None:
         if self._transcript:
             self._transcript.write(f"**[{tool}]** {activity}\n")
-            self._transcript.flush()
 
     def write_agent_text(self, text: str) -> None:
         if self._transcript:
             self._transcript.write(f"\n{text}\n\n")
-            self._transcript.flush()
 
     def write_result(self, cost: float, duration_ms: int, turns: int) -> None:
         if self._transcript:
@@ -148,21 +186,24 @@ class PhaseLog:
                 f"\n---\n"
                 f"Cost: ${cost:.4f} | "
                 f"Duration: {duration_ms / 1000:.1f}s | "
-                f"Turns: {turns}\n"
+                f"Turns: {turns}\n",
+                block=True,
             )
-            self._transcript.flush()
 
     def write_verification(self, passed: bool, message: str) -> None:
         if self._transcript:
             status = "PASSED" if passed else "FAILED"
-            self._transcript.write(f"\n**Verification {status}:** {message}\n")
-            self._transcript.flush()
+            self._transcript.write(f"\n**Verification {status}:** {message}\n", block=True)
 
 
 class Orchestrator:
     """Runs the bytA workflow: phase loop with Ralph-Loop retries."""
 
     MAX_RETRIES = 3
+    # Skip regeneration if the watcher refreshed structure.md this recently
+    CONTEXT_FRESH_S = 10.0
+    # claude stderr lines kept for failure messages and retry prompts
+    STDERR_TAIL_LINES = 50
 
     def __init__(
         self,
@@ -174,6 +215,7 @@ class Orchestrator:
         on_activity: ActivityCallback | None = None,
         on_live_log: LiveLogCallback | None = None,
         on_summary: SummaryCallback | None = None,
+        watch_context: bool = False,
     ):
         self.config = config
         self.project_dir = project_dir
@@ -188,7 +230,15 @@ class Orchestrator:
         self._cancelled = False
         self._current_process: asyncio.subprocess.Process | None = None
         self._current_log: PhaseLog | None = None
+        # Session id of the running claude process (from its system/init event)
+        self._session_id: str | None = None
+        # Last stderr lines of the running (or last) claude process
+        self._stderr_tail: deque[str] = deque(maxlen=self.STDERR_TAIL_LINES)
         self._logs_dir = project_dir / ".workflow" / "logs"
+        # Optional: keep structure.md hot while the agent writes code
+        self._watcher: StructureWatcher | None = None
+        if watch_context:
+            self._watcher = StructureWatcher(project_dir, on_error=self._emit_live)
 
     def cancel(self) -> None:
         self._cancelled = True
@@ -397,7 +447,7 @@ class Orchestrator:
         # Try extracting structured sections
         for heading in ("Phase Summary", "Findings Overview", "Critical Issues",
                         "Major Issues", "Implementation Bugs"):
-            section = _extract_section(content, heading)
+            section = extract_section(content, heading)
             if section:
                 return section
 
@@ -417,6 +467,8 @@ class Orchestrator:
                 for f in specs_dir.glob(pattern):
                     self._emit(f"[dim]  Removing {f.name}[/]")
                     f.unlink()
+                for f in (specs_dir / "digests").glob(pattern):
+                    f.unlink()
 
     def _reset_phase_statuses(self, from_phase: int, to_phase: int) -> None:
         """Reset phase statuses in workflow-state.json for rollback range."""
@@ -440,8 +492,8 @@ class Orchestrator:
     async def _run_phase(
         self, phase: Phase, extra_context: str = "", feedback: str = ""
     ) -> PhaseResult:
-        # Regenerate codebase context before each phase
-        self._update_codebase_context()
+        # Regenerate codebase context before each phase (off the event loop)
+        await asyncio.to_thread(self._update_codebase_context)
 
         self.phase_start_time = time.monotonic()
         self._notify_phase(phase.number, PhaseStatus.RUNNING)
@@ -454,6 +506,9 @@ class Orchestrator:
         self._current_log = phase_log
 
         last_failure: str = ""  # Carries verification error to next attempt
+        # Session of the last attempt that ran to completion; a retry resumes it
+        # with just the verification error instead of re-running the full prompt
+        session_id: str | None = None
 
         for attempt in range(1, self.MAX_RETRIES + 1):
             if self._cancelled:
@@ -465,35 +520,51 @@ class Orchestrator:
             if self.MAX_RETRIES > 1:
                 self._emit(f"--- Attempt {attempt}/{self.MAX_RETRIES}")
 
+            sizes = PromptSizes()
+            # On retry: inject the verification error so the agent knows what went wrong
+            retry = RetryInfo(attempt, self.MAX_RETRIES, last_failure) if last_failure else None
+            resume = session_id if retry else None
+            if retry and resume:
+                # The session still holds the full prompt and what the agent read
+                prompt = build_resume_prompt(retry, sizes)
+                self._emit_live(f"[dim]  Resuming session {resume}[/]")
+            else:
+                prompt = await build_prompt_async(
+                    phase, self.config, self.project_dir, feedback=feedback, sizes=sizes,
+                    extra_context=extra_context, retry=retry,
+                )
+
             # Open log files (append on retries)
             phase_log.open(attempt)
-            phase_log.write_header(phase.number, phase.name, phase.agent, attempt)
-
-            prompt = build_prompt(
-                phase, self.config, self.project_dir, feedback=feedback
+            phase_log.write_header(
+                phase.number, phase.name, phase.agent, attempt,
+                prompt_sizes=sizes, resumed_session=resume,
             )
-            if extra_context:
-                prompt += f"\n\n## Additional Context\n{extra_context}"
-
-            # On retry: inject the verification error so the agent knows what went wrong
-            if last_failure:
-                prompt += (
-                    f"\n\n## RETRY — Previous Attempt Failed\n"
-                    f"This is attempt {attempt}/{self.MAX_RETRIES}. "
-                    f"The previous attempt failed verification:\n\n"
-                    f"**Error:** {last_failure}\n\n"
-                    f"Fix this issue before completing your work. "
-                    f"Make sure all required output files are written."
-                )
 
-            success = await self._run_claude(phase, prompt)
+            if self._watcher:
+                self._watcher.start()
+            try:
+                success = await self._run_claude(phase, prompt, resume=resume)
+            finally:
+                # The agent may have created files — next listing must re-query git
+                invalidate_file_index(self.project_dir)
+                if self._watcher:
+                    # final refresh: context ready for next phase
+                    await asyncio.to_thread(self._watcher.stop)
+            # A crashed session may be incomplete or unknown: next attempt starts fresh
+            session_id = self._session_id if success else None
 
             if not success:
                 last_failure = "Claude process exited with non-zero exit code"
+                stderr_tail = self._stderr_excerpt()
+                if stderr_tail:
+                    last_failure += f"\n\nLast stderr output:\n```\n{stderr_tail}\n```"
+                last_line = self._stderr_tail[-1] if self._stderr_tail else ""
                 fail_msg = (
                     f"[bold red]FAILED[/] Phase {phase.number} "
                     f"attempt {attempt}/{self.MAX_RETRIES}: "
                     f"Claude process crashed"
+                    + (f" — {escape(last_line)}" if last_line else "")
                 )
                 self._emit(f"\n{fail_msg}")
                 self._emit_live(fail_msg)
@@ -505,10 +576,10 @@ class Orchestrator:
                     self._emit(retry_msg)
                     self._emit_live(retry_msg)
                 phase_log.write_verification(False, "Claude process failed")
-                phase_log.close()
+                self._record_attempt_metrics(phase, attempt, sizes, resume, phase_log.close())
                 continue
 
-            ok, msg = verify_phase(phase, self.project_dir)
+            ok, msg = await verify_phase_async(phase, self.project_dir)
             phase_log.write_verification(ok, msg)
 
             if ok:
@@ -519,7 +590,7 @@ class Orchestrator:
                 )
                 self._emit(f"\n{pass_msg}")
                 self._emit_live(pass_msg)
-                phase_log.close()
+                self._record_attempt_metrics(phase, attempt, sizes, resume, phase_log.close())
                 self._current_log = None
 
                 # Show summaries after phase completion
@@ -566,7 +637,7 @@ class Orchestrator:
                 )
                 self._emit(retry_msg)
                 self._emit_live(retry_msg)
-            phase_log.close()
+            self._record_attempt_metrics(phase, attempt, sizes, resume, phase_log.close())
 
         self._current_log = None
         total_elapsed = time.monotonic() - self.phase_start_time
@@ -581,13 +652,21 @@ class Orchestrator:
             phase, PhaseStatus.FAILED, "Max retries exceeded", self.MAX_RETRIES, total_elapsed
         )
 
-    async def _run_claude(self, phase: Phase, prompt: str) -> bool:
-        """Invoke claude -p with stream-json output for live activity."""
+    async def _run_claude(
+        self, phase: Phase, prompt: str, resume: str | None = None
+    ) -> bool:
+        """Invoke claude -p with stream-json output for live activity.
+
+        The prompt is written to stdin rather than passed as an argument:
+        it can exceed the per-argument limit (128 KiB on Linux) and would
+        otherwise be visible in ``ps``. With ``resume``, the prompt is the
+        next turn of that session. The session id of this run is left in
+        self._session_id.
+        """
         tools = ",".join(phase.tools)
         cmd = [
             "claude",
             "-p",
-            prompt,
             "--tools",
             tools,
             "--output-format",
@@ -599,6 +678,10 @@ class Orchestrator:
             cmd.extend(["--model", phase.model])
         if phase.max_turns > 0:
             cmd.extend(["--max-turns", str(phase.max_turns)])
+        if resume:
+            cmd.extend(["--resume", resume])
+        self._session_id = None
+        self._stderr_tail.clear()
 
         env: dict[str, str] = {"CLAUDECODE": ""}  # Prevent nested-session error
 
@@ -608,6 +691,7 @@ class Orchestrator:
 
             process = await asyncio.create_subprocess_exec(
                 *cmd,
+                stdin=asyncio.subprocess.PIPE,
                 stdout=asyncio.subprocess.PIPE,
                 stderr=asyncio.subprocess.PIPE,
                 cwd=str(self.project_dir),
@@ -615,29 +699,31 @@ class Orchestrator:
                 limit=4 * 1024 * 1024,  # 4 MB line buffer (stream-json events can be large)
             )
             self._current_process = process
-
-            if process.stdout:
-                async for line in process.stdout:
-                    text = line.decode("utf-8", errors="replace").rstrip()
-                    if not text:
-                        continue
-                    # Write raw line to JSONL log
-                    if self._current_log:
-                        self._current_log.write_raw(text)
-                    self._process_stream_event(text)
-
-            await process.wait()
+            # Feed the prompt and drain stderr concurrently, so neither a full
+            # stdin nor a full stderr pipe can stall the process
+            feeder = asyncio.create_task(self._write_prompt(process, prompt))
+            stderr_drain = asyncio.create_task(self._drain_stderr(process))
+
+            try:
+                if process.stdout:
+                    async for line in process.stdout:
+                        text = line.decode("utf-8", errors="replace").rstrip()
+                        if not text:
+                            continue
+                        # Write raw line to JSONL log
+                        if self._current_log:
+                            self._current_log.write_raw(text)
+                        self._process_stream_event(text)
+
+                await process.wait()
+                await feeder
+                await stderr_drain
+            finally:
+                feeder.cancel()
+                stderr_drain.cancel()
             self._current_process = None
 
-            if process.returncode != 0:
-                if process.stderr:
-                    stderr = await process.stderr.read()
-                    err = stderr.decode("utf-8", errors="replace").strip()
-                    if err:
-                        self._emit_live(f"[dim red]stderr: {err}[/]")
-                return False
-
-            return True
+            return process.returncode == 0
 
         except FileNotFoundError:
             self._emit("Error: 'claude' CLI not found in PATH")
@@ -646,17 +732,80 @@ class Orchestrator:
             self._emit(f"Error: {e}")
             return False
 
+    async def _drain_stderr(self, process: asyncio.subprocess.Process) -> None:
+        """Stream the process's stderr line by line until it closes.
+
+        Read in chunks rather than lines, so an overlong line can't hit the
+        stream limit; partial lines are capped at _STDERR_LINE_CHARS.
+        """
+        if not process.stderr:
+            return
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        pending = ""
+        while chunk := await process.stderr.read(_STDERR_CHUNK):
+            pending += decoder.decode(chunk)
+            *lines, pending = pending.split("\n")
+            if len(pending) > _STDERR_LINE_CHARS:
+                lines.append(pending)
+                pending = ""
+            for line in lines:
+                self._record_stderr(line)
+        self._record_stderr(pending + decoder.decode(b"", final=True))
+
+    def _record_stderr(self, line: str) -> None:
+        """Keep a stderr line in the tail; show it live and in the transcript."""
+        line = line.rstrip()
+        if not line:
+            return
+        self._stderr_tail.append(line[:_STDERR_LINE_CHARS])
+        self._emit_live(f"[dim red]stderr: {escape(line[:300])}[/]")
+        if self._current_log:
+            self._current_log.write_transcript(f"`stderr:` {line}")
+
+    def _stderr_excerpt(self, max_lines: int = 20, max_line_chars: int = 300) -> str:
+        """The last stderr lines of the last claude run, for failure messages."""
+        return "\n".join(
+            line if len(line) <= max_line_chars else line[:max_line_chars] + " ..."
+            for line in list(self._stderr_tail)[-max_lines:]
+        )
+
+    async def _write_prompt(self, process: asyncio.subprocess.Process, prompt: str) -> None:
+        """Write the prompt to the process's stdin and close it."""
+        if not process.stdin:
+            return
+        try:
+            process.stdin.write(prompt.encode("utf-8"))
+            await process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # process exited early; its exit code reports the failure
+        finally:
+            process.stdin.close()
+
     def _process_stream_event(self, raw_line: str) -> None:
-        """Parse a stream-json line and emit human-readable activity."""
+        """Parse a stream-json line and emit human-readable activity.
+
+        The type is sniffed first: events nothing here reacts to (mostly
+        ``user`` tool results, often MBs of file or command output) are only
+        written to the raw log, never decoded.
+        """
+        sniffed = sniff_event_type(raw_line)
+        if sniffed is not None and sniffed not in _HANDLED_EVENTS:
+            return
         try:
-            event = json.loads(raw_line)
-        except json.JSONDecodeError:
+            event = loads_event(raw_line)
+        except ValueError:
+            return
+        if not isinstance(event, dict):
             return
 
         event_type = event.get("type", "")
         log = self._current_log
 
-        if event_type == "assistant":
+        if event_type == "system":
+            if event.get("subtype") == "init" and event.get("session_id"):
+                self._session_id = event["session_id"]
+
+        elif event_type == "assistant":
             message = event.get("message", {})
             content_blocks = message.get("content", [])
             for block in content_blocks:
@@ -807,51 +956,26 @@ class Orchestrator:
 
         self._emit(f"Setting up branch: {branch_name} (from {cfg.from_branch})")
 
+        git = git_service(self.project_dir)
         try:
             # Fetch latest
-            proc = await asyncio.create_subprocess_exec(
-                "git", "fetch", "--prune",
-                cwd=str(self.project_dir),
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-            )
-            await proc.wait()
+            await git.arun("fetch", "--prune", timeout=120)
 
             # Force-checkout base branch (discards uncommitted changes)
-            proc = await asyncio.create_subprocess_exec(
-                "git", "checkout", "-f", cfg.from_branch,
-                cwd=str(self.project_dir),
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-            )
-            await proc.wait()
-            if proc.returncode != 0:
-                stderr = await proc.stderr.read() if proc.stderr else b""
-                self._emit(f"Failed to checkout {cfg.from_branch}: {stderr.decode()}")
+            result = await git.arun("checkout", "-f", cfg.from_branch)
+            if not result.ok:
+                self._emit(f"Failed to checkout {cfg.from_branch}: {result.stderr}")
                 return False
 
             # Delete existing feature branch if it exists (discards all commits)
-            proc = await asyncio.create_subprocess_exec(
-                "git", "branch", "-D", branch_name,
-                cwd=str(self.project_dir),
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-            )
-            await proc.wait()
-            if proc.returncode == 0:
+            result = await git.arun("branch", "-D", branch_name)
+            if result.ok:
                 self._emit(f"Deleted old branch: {branch_name}")
 
             # Create fresh feature branch from base
-            proc = await asyncio.create_subprocess_exec(
-                "git", "checkout", "-b", branch_name,
-                cwd=str(self.project_dir),
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-            )
-            await proc.wait()
-            if proc.returncode != 0:
-                stderr = await proc.stderr.read() if proc.stderr else b""
-                self._emit(f"Failed to create {branch_name}: {stderr.decode()}")
+            result = await git.arun("checkout", "-b", branch_name)
+            if not result.ok:
+                self._emit(f"Failed to create {branch_name}: {result.stderr}")
                 return False
 
             self._emit(f"Created fresh branch: {branch_name}")
@@ -860,6 +984,8 @@ class Orchestrator:
         except Exception as e:
             self._emit(f"Git error: {e}")
             return False
+        finally:
+            git.invalidate()
 
     def _write_initial_state(self) -> None:
         """Write workflow-state.json with startup configuration."""
@@ -929,7 +1055,8 @@ class Orchestrator:
     def _clean_workflow_state(self) -> None:
         """Remove workflow-specific files but preserve persistent context.
 
-        Preserved: .workflow/context/architecture.md (agent-maintained knowledge)
+        Preserved: .workflow/context/architecture.md (agent-maintained knowledge),
+                   .workflow/metrics/ (prompt size trends)
         Deleted:   workflow-state.json, issue.json, specs/*, logs/*
         """
         import shutil
@@ -952,6 +1079,8 @@ class Orchestrator:
 
         # context/architecture.md is preserved (agent-maintained knowledge)
         # context/structure.md is preserved (regenerated before each phase anyway)
+        # context/symbols.db is preserved (symbol index, reused across issues)
+        # metrics/ is preserved (prompt size trends across runs)
 
     def _show_plan_summary(self) -> None:
         """Send Executive Summary as markdown to the summary panel."""
@@ -966,12 +1095,12 @@ class Orchestrator:
         spec_content = plan_files[0].read_text(encoding="utf-8", errors="replace")
 
         # Try to extract ## Executive Summary section
-        summary = _extract_section(spec_content, "Executive Summary")
+        summary = extract_section(spec_content, "Executive Summary")
         heading = "Executive Summary"
 
         # Fallback: try ## Architecture Overview
         if not summary:
-            summary = _extract_section(spec_content, "Architecture Overview")
+            summary = extract_section(spec_content, "Architecture Overview")
             heading = "Architecture Overview"
 
         # Fallback: show first lines
@@ -1008,7 +1137,7 @@ class Orchestrator:
             return
 
         content = spec_files[0].read_text(encoding="utf-8", errors="replace")
-        summary = _extract_section(content, "Phase Summary")
+        summary = extract_section(content, "Phase Summary")
 
         if not summary:
             lines = [l for l in content.strip().splitlines() if l.strip()][:8]
@@ -1020,10 +1149,49 @@ class Orchestrator:
                 f"## Phase Summary\n\n{summary}",
             )
 
+    def _record_attempt_metrics(
+        self,
+        phase: Phase,
+        attempt: int,
+        sizes: PromptSizes,
+        resumed_session: str | None,
+        log_stats: dict[str, dict[str, int]],
+    ) -> None:
+        """Append this attempt's prompt section sizes and log writer metrics
+        to .workflow/metrics/.
+
+        One JSONL file per phase; kept across workflow runs for trends.
+        """
+        metrics_dir = self.project_dir / ".workflow" / "metrics"
+        record = {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "issue": self.config.issue_num,
+            "phase": phase.number,
+            "agent": phase.agent,
+            "model": phase.model or "default",
+            "attempt": attempt,
+            "resumed": resumed_session is not None,
+            **sizes.as_dict(),
+            "logs": log_stats,
+        }
+        try:
+            metrics_dir.mkdir(parents=True, exist_ok=True)
+            path = metrics_dir / f"phase-{phase.number}-{phase.agent}.jsonl"
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError:
+            pass  # metrics are best-effort
+
     def _update_codebase_context(self) -> None:
         """Regenerate structure.md and ensure architecture.md exists."""
+        watcher = self._watcher
+        if watcher and time.monotonic() - watcher.refreshed_at < self.CONTEXT_FRESH_S:
+            self._emit("[dim]Codebase context up to date (watcher)[/]")
+            init_architecture(self.project_dir)
+            return
         self._emit("[dim]Updating codebase context...[/]")
-        write_structure(self.project_dir)
+        if not write_structure(self.project_dir):
+            self._emit("[dim]  structure.md unchanged[/]")
         init_architecture(self.project_dir)
 
     def _emit(self, text: str) -> None:
@@ -1,12 +1,17 @@
 """Prompt builder for each workflow phase."""
 
+import asyncio
 import json
 import re
-import subprocess
-from pathlib import Path
+from dataclasses import dataclass, field
+from pathlib import Path, PurePosixPath
 
-from .codebase import read_context
-from .config import Phase, Scope, WorkflowConfig
+from .codebase import ContextFocus, build_file_index, estimate_tokens, read_context
+from .config import Phase, PromptLayout, Scope, WorkflowConfig
+from .filecache import read_cached
+from .gitservice import git_service
+from .specs import spec_digest, spec_phase
+from .testmap import build_test_map, is_test_file
 
 # Directory containing agent definition files (copied from bytA)
 _AGENTS_DIR = Path(__file__).parent / "agents"
@@ -64,19 +69,18 @@ PHASE_FALLBACK: dict[int, str] = {
 }
 
 
-def _read_agent(agent_name: str) -> str:
-    """Read agent definition file, strip YAML frontmatter, return body."""
-    agent_file = _AGENTS_DIR / f"{agent_name}.md"
-    if not agent_file.exists():
-        return ""
-
-    content = agent_file.read_text(encoding="utf-8", errors="replace")
-
+def _strip_frontmatter(content: str) -> str:
     # Strip YAML frontmatter (--- ... ---)
     stripped = re.sub(r"\A---\n.*?\n---\n*", "", content, count=1, flags=re.DOTALL)
     return stripped.strip()
 
 
+def _read_agent(agent_name: str) -> str:
+    """Read agent definition file, strip YAML frontmatter, return body."""
+    agent_file = _AGENTS_DIR / f"{agent_name}.md"
+    return read_cached(agent_file, _strip_frontmatter) or ""
+
+
 def _scope_sections(scope: Scope) -> str:
     """Generate planning sections based on scope."""
     sections: list[str] = []
@@ -92,12 +96,13 @@ def _scope_sections(scope: Scope) -> str:
 def _read_issue(project_dir: Path) -> str:
     """Read the persisted GitHub issue from .workflow/issue.json."""
     issue_file = project_dir / ".workflow" / "issue.json"
-    if not issue_file.exists():
-        return ""
+    return read_cached(issue_file, _format_issue) or ""
+
 
+def _format_issue(content: str) -> str:
     try:
-        data = json.loads(issue_file.read_text(encoding="utf-8"))
-    except (json.JSONDecodeError, OSError):
+        data = json.loads(content)
+    except json.JSONDecodeError:
         return ""
 
     parts: list[str] = []
@@ -115,16 +120,44 @@ def _read_issue(project_dir: Path) -> str:
     return "\n".join(parts)
 
 
-def _read_specs(project_dir: Path) -> str:
-    """Read all existing spec files from .workflow/specs/."""
+# Specs each phase needs in full; all other specs are given as digests.
+# 0 = consolidated plan, N = phase N's report.
+_SPEC_DEPENDENCIES: dict[int, set[int]] = {
+    0: set(),
+    1: {0},
+    2: {0, 1},
+    3: {0, 2},
+    4: {0},
+    5: set(),
+    6: {0},
+    7: set(),
+    8: set(),
+}
+
+
+def _read_specs(project_dir: Path, phase_number: int | None = None) -> str:
+    """Read existing spec files from .workflow/specs/.
+
+    With a phase number, only the specs that phase depends on (see
+    _SPEC_DEPENDENCIES) are inlined in full; the others as digests.
+    """
     specs_dir = project_dir / ".workflow" / "specs"
     if not specs_dir.exists():
         return ""
 
+    full_text = _SPEC_DEPENDENCIES.get(phase_number, set()) if phase_number is not None else None
     parts: list[str] = []
     for f in sorted(specs_dir.glob("*.md")):
-        content = f.read_text(encoding="utf-8", errors="replace")
-        parts.append(f"### {f.name}\n{content}")
+        if full_text is None or spec_phase(f.name) in full_text:
+            content = read_cached(f)
+            if content is None:
+                continue
+            parts.append(f"### {f.name}\n{content}")
+        else:
+            parts.append(
+                f"### {f.name} (digest — full text: .workflow/specs/{f.name})\n"
+                f"{spec_digest(f)}"
+            )
 
     return "\n\n".join(parts)
 
@@ -132,14 +165,20 @@ def _read_specs(project_dir: Path) -> str:
 def _read_state(project_dir: Path) -> str:
     """Read workflow-state.json if it exists."""
     state_file = project_dir / ".workflow" / "workflow-state.json"
-    if state_file.exists():
-        return state_file.read_text(encoding="utf-8", errors="replace")
-    return ""
+    return read_cached(state_file) or ""
 
 
 # Max total characters for pre-read file content (avoid prompt bloat)
 _PRE_READ_LIMIT = 60_000
 
+# Max total prompt size in characters (~100k tokens). The prompt goes to the
+# CLI via stdin, so argv limits don't apply; this keeps room in the model's
+# context window for the agent's own turns. Pre-read shrinks to fit.
+_PROMPT_CHAR_LIMIT = 400_000
+# Headroom for the pre-read section's own heading and separators; retry notes
+# and extra context are already part of the prompt measured in _pre_read_limit
+_PROMPT_MARGIN = 8_000
+
 
 def _extract_file_paths(spec_content: str) -> list[str]:
     """Extract file paths mentioned in the plan spec.
@@ -162,94 +201,323 @@ def _extract_file_paths(spec_content: str) -> list[str]:
     return result
 
 
-def _git_changed_files(project_dir: Path, base_branch: str) -> list[str]:
-    """Get list of files changed on the current branch vs base branch."""
-    try:
-        result = subprocess.run(
-            ["git", "diff", "--name-only", f"{base_branch}...HEAD"],
-            capture_output=True, text=True,
-            cwd=str(project_dir), timeout=10,
-        )
-        if result.returncode == 0:
-            return [f for f in result.stdout.strip().splitlines() if f]
-    except Exception:
-        pass
-
-    # Fallback: uncommitted changes
-    try:
-        result = subprocess.run(
-            ["git", "diff", "--name-only", "HEAD"],
-            capture_output=True, text=True,
-            cwd=str(project_dir), timeout=10,
-        )
-        if result.returncode == 0:
-            files = [f for f in result.stdout.strip().splitlines() if f]
-            # Also include untracked files
-            result2 = subprocess.run(
-                ["git", "ls-files", "--others", "--exclude-standard"],
-                capture_output=True, text=True,
-                cwd=str(project_dir), timeout=10,
-            )
-            if result2.returncode == 0:
-                files.extend(f for f in result2.stdout.strip().splitlines() if f)
-            return files
-    except Exception:
-        pass
-
-    return []
+# Relevance weights for pre-read candidates by role in the codebase
+_ROLE_WEIGHTS: list[tuple[str, float]] = [
+    ("/migration/", 3.0),
+    ("/entity/", 3.0),
+    ("/controller/", 3.0),
+    ("/resource/", 2.5),
+    ("/service/", 2.0),
+    (".service.ts", 2.0),
+    (".component.ts", 2.0),
+    ("/repository/", 1.5),
+    ("/dto/", 1.5),
+    ("/model/", 1.5),
+    (".model.ts", 1.5),
+    ("app.routes.ts", 1.5),
+]
+# An outline is worth this fraction of the full file
+_OUTLINE_VALUE = 0.35
+# Packed value is score ** exponent, so one relevant file beats many trivial ones
+_SCORE_EXPONENT = 2
+# Knapsack resolution: the character limit is split into this many units
+_PACK_UNITS = 600
+# Lines kept for outlines of files without brace structure (SQL, HTML, ...)
+_OUTLINE_HEAD_LINES = 25
+
+_BINARY_SUFFIXES = (".class", ".jar", ".png", ".jpg", ".gif", ".pdf", ".lock")
+_BRACE_SUFFIXES = (".java", ".ts", ".js", ".kt", ".scss", ".css")
+_STRING_LITERAL_RE = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|`[^`]*`')
+
+
+@dataclass
+class _PreReadCandidate:
+    path: str
+    content: str
+    position: int
+    score: float = 0.0
+    outline: str = ""
+
+
+def _outline(path: str, content: str) -> str:
+    """Signatures only: top-level and member declarations, bodies elided."""
+    lines = content.splitlines()
+    if not path.endswith(_BRACE_SUFFIXES):
+        head = lines[:_OUTLINE_HEAD_LINES]
+        if len(lines) > len(head):
+            head.append(f"... ({len(lines) - len(head)} more lines)")
+        return "\n".join(head)
+
+    out: list[str] = []
+    depth = 0
+    imports = 0
+    for line in lines:
+        stripped = line.strip()
+        code = _STRING_LITERAL_RE.sub("", stripped.split("//", 1)[0])
+        opens, closes = code.count("{"), code.count("}")
+        if depth <= 1 and stripped and not stripped.startswith(("/*", "*", "//")):
+            if stripped.startswith("import "):
+                imports += 1
+            elif depth + opens - closes > 1 and depth == 1:
+                out.append(line.rstrip() + " ... }")
+            elif depth + opens - closes >= 0:
+                out.append(line.rstrip())
+        depth = max(depth + opens - closes, 0)
+    if imports:
+        out.insert(0, f"// {imports} imports omitted")
+    return "\n".join(out)
+
+
+def _reference_pattern(path: str) -> re.Pattern[str] | None:
+    """How other files refer to this one: its Java type name or TS module path."""
+    pure = PurePosixPath(path)
+    if pure.suffix == ".java":
+        return re.compile(rf"\b{re.escape(pure.stem)}\b")
+    if pure.suffix == ".ts":
+        return re.compile(rf"/{re.escape(pure.stem)}['\"]")
+    return None
+
+
+def _role_weight(path: str) -> float:
+    return max((w for marker, w in _ROLE_WEIGHTS if marker in path), default=0.0)
+
+
+def _score_candidates(
+    candidates: list[_PreReadCandidate], plan_text: str, diff_sizes: dict[str, int]
+) -> None:
+    """Score by plan mentions, diff size, role, and references from other candidates."""
+    count = len(candidates)
+    for c in candidates:
+        score = 1.0 + _role_weight(c.path)
+        score += 2.0 * min(plan_text.count(c.path), 3)
+        score += min(diff_sizes.get(c.path, 0) / 50, 3.0)
+        # Referenced by other candidates (Java type name / TS import path)
+        ref = _reference_pattern(c.path)
+        if ref:
+            refs = sum(1 for o in candidates if o is not c and ref.search(o.content))
+            score += min(refs, 3)
+        if "/test/" in c.path or ".spec." in c.path:
+            score *= 0.7
+        c.score = score + 0.5 * (count - c.position) / count  # tie-break: input order
+
+
+def _pack(candidates: list[_PreReadCandidate], limit: int) -> dict[str, str]:
+    """Choose full / outline / nothing per file to maximise score within limit.
+
+    Multiple-choice 0/1 knapsack with the limit split into _PACK_UNITS units.
+    Returns path -> "full" | "outline" for the chosen files.
+    """
+    unit = max(limit // _PACK_UNITS, 1)
+    capacity = limit // unit
+
+    def units(text: str, path: str) -> int:
+        return -(-(len(text) + len(path) + 16) // unit)  # ceil
+
+    options = [
+        [
+            ("full", units(c.content, c.path), c.score ** _SCORE_EXPONENT),
+            (
+                "outline",
+                units(c.outline, c.path),
+                c.score ** _SCORE_EXPONENT * _OUTLINE_VALUE,
+            ),
+        ]
+        for c in candidates
+    ]
+    best = [0.0] * (capacity + 1)
+    choice: list[list[int]] = []  # choice[i][cap] = option index + 1 (0 = skip)
+    for opts in options:
+        row = [0] * (capacity + 1)
+        new = best[:]
+        for cap in range(capacity + 1):
+            for k, (_, cost, value) in enumerate(opts):
+                if cost <= cap and best[cap - cost] + value > new[cap]:
+                    new[cap] = best[cap - cost] + value
+                    row[cap] = k + 1
+        best = new
+        choice.append(row)
+
+    chosen: dict[str, str] = {}
+    cap = capacity
+    for i in range(len(candidates) - 1, -1, -1):
+        k = choice[i][cap]
+        if k:
+            mode, cost, _ = options[i][k - 1]
+            chosen[candidates[i].path] = mode
+            cap -= cost
+    return chosen
+
+
+def _skipped_notice(skipped: list[str], limit: int, used: int) -> str:
+    """List files left out, naming only as many as the remaining limit allows."""
+    notice = f"_Not pre-read (character limit {limit:,}): "
+    room = limit - used - len(notice) - 24
+    names: list[str] = []
+    for path in skipped:
+        room -= len(path) + 2
+        if room < 0:
+            break
+        names.append(path)
+    more = len(skipped) - len(names)
+    return notice + ", ".join(names) + (f" (+{more} more)" if more else "") + "_"
 
 
-def _read_files_content(project_dir: Path, file_paths: list[str]) -> str:
-    """Read file contents up to the character limit, return formatted block."""
-    parts: list[str] = []
-    total_chars = 0
+def _read_files_content(
+    project_dir: Path,
+    file_paths: list[str],
+    plan_text: str = "",
+    diff_sizes: dict[str, int] | None = None,
+    limit: int = _PRE_READ_LIMIT,
+) -> str:
+    """Read the most relevant files that fit the character limit.
 
-    for rel_path in file_paths:
-        full_path = project_dir / rel_path
-        if not full_path.exists() or not full_path.is_file():
-            continue
+    Candidates are scored (see _score_candidates) and packed into ``limit``
+    chars; files that don't fit in full are included as outlines (signatures
+    only) when that is the better use of the budget.
+    """
+    candidates: list[_PreReadCandidate] = []
+    for rel_path in dict.fromkeys(file_paths):
         # Skip binary / large files
-        if full_path.suffix in (".class", ".jar", ".png", ".jpg", ".gif", ".pdf", ".lock"):
+        if rel_path.endswith(_BINARY_SUFFIXES):
             continue
-        try:
-            content = full_path.read_text(encoding="utf-8", errors="replace")
-        except Exception:
+        content = read_cached(project_dir / rel_path)  # None if missing or a directory
+        if content is None:
             continue
+        candidates.append(_PreReadCandidate(rel_path, content, len(candidates)))
+    if not candidates:
+        return ""
 
-        if total_chars + len(content) > _PRE_READ_LIMIT:
-            remaining = _PRE_READ_LIMIT - total_chars
-            if remaining > 500:  # only include if we can fit something meaningful
-                content = content[:remaining] + "\n... (truncated)"
-                parts.append(f"### {rel_path}\n```\n{content}\n```")
-            parts.append(f"\n_Stopped pre-reading: character limit reached ({_PRE_READ_LIMIT:,} chars)_")
-            break
+    _score_candidates(candidates, plan_text, diff_sizes or {})
+    for c in candidates:
+        c.outline = _outline(c.path, c.content)
+    chosen = _pack(candidates, limit)
 
-        parts.append(f"### {rel_path}\n```\n{content}\n```")
-        total_chars += len(content)
+    parts: list[str] = []
+    skipped: list[str] = []
+    for c in sorted(candidates, key=lambda c: -c.score):
+        mode = chosen.get(c.path)
+        if mode == "full":
+            parts.append(f"### {c.path}\n```\n{c.content}\n```")
+        elif mode == "outline":
+            parts.append(
+                f"### {c.path} (outline — Read the file for full content)\n```\n{c.outline}\n```"
+            )
+        else:
+            skipped.append(c.path)
+    if skipped:
+        parts.append(_skipped_notice(skipped, limit, len("\n\n".join(parts))))
+    return "\n\n".join(parts)
+
+
+def _diff_line_count(hunk: str) -> int:
+    return sum(
+        1 for line in hunk.splitlines()
+        if line[:1] in "+-" and not line.startswith(("+++", "---"))
+    )
 
+
+def _added_file_hunk(content: str) -> str:
+    """A new file as one all-added hunk (like ``git diff --no-index /dev/null <file>``)."""
+    lines = content.splitlines()
+    return f"@@ -0,0 +1,{len(lines)} @@\n" + "\n".join(f"+{line}" for line in lines)
+
+
+def _read_diff_content(
+    project_dir: Path,
+    file_paths: list[str],
+    plan_text: str,
+    base_branch: str,
+    context_lines: int,
+    limit: int = _PRE_READ_LIMIT,
+) -> str:
+    """Diff hunks + compact outline per changed file, ranked and packed.
+
+    New (untracked) files count as all-added hunks. Files whose hunks don't
+    fit keep their outline. Packing is costed on the exact text emitted.
+    """
+    hunks = git_service(project_dir).diff_hunks(base_branch, context_lines)
+    candidates: list[_PreReadCandidate] = []
+    new_files: set[str] = set()
+    for rel_path in dict.fromkeys([*file_paths, *hunks]):
+        if rel_path.endswith(_BINARY_SUFFIXES):
+            continue
+        source = read_cached(project_dir / rel_path)
+        hunk = hunks.get(rel_path, "")
+        if not hunk:
+            if source is None:
+                continue
+            hunk = _added_file_hunk(source)
+            new_files.add(rel_path)
+        outline = _outline(rel_path, source) if source is not None else "(deleted)"
+        candidates.append(
+            _PreReadCandidate(rel_path, hunk, len(candidates), outline=outline)
+        )
+    if not candidates:
+        return ""
+
+    diff_sizes = {c.path: _diff_line_count(c.content) for c in candidates}
+    _score_candidates(candidates, plan_text, diff_sizes)
+    # Render both options up front so _pack costs what is actually emitted
+    for c in candidates:
+        if c.path in new_files:
+            full = f"### {c.path} (new file)\n```diff\n{c.content}\n```"
+            label = "new file"
+        else:
+            full = (
+                f"### {c.path}\nOutline:\n```\n{c.outline}\n```\n"
+                f"Changes:\n```diff\n{c.content}\n```"
+            )
+            label = "changes omitted"
+        c.content = full
+        c.outline = f"### {c.path} ({label}, outline)\n```\n{c.outline}\n```"
+    chosen = _pack(candidates, limit)
+
+    parts: list[str] = []
+    skipped: list[str] = []
+    for c in sorted(candidates, key=lambda c: -c.score):
+        mode = chosen.get(c.path)
+        if mode == "full":
+            parts.append(c.content)
+        elif mode == "outline":
+            parts.append(c.outline)
+        else:
+            skipped.append(c.path)
+    if skipped:
+        parts.append(_skipped_notice(skipped, limit, len("\n\n".join(parts))))
     return "\n\n".join(parts)
 
 
-def _pre_read_files(phase: Phase, config: WorkflowConfig, project_dir: Path) -> str:
+def _read_plan(project_dir: Path) -> str:
+    """Content of the consolidated plan spec (Phase 0 output), if any."""
+    specs_dir = project_dir / ".workflow" / "specs"
+    plan_files = list(specs_dir.glob("*plan-consolidated.md")) if specs_dir.exists() else []
+    if not plan_files:
+        return ""
+    return read_cached(plan_files[0]) or ""
+
+
+def _pre_read_files(
+    phase: Phase, config: WorkflowConfig, project_dir: Path, limit: int = _PRE_READ_LIMIT
+) -> str:
     """Pre-read relevant files for a phase to reduce agent exploration turns.
 
     Phase 0, 7: no pre-reading
     Phase 1-3:  files mentioned in the plan spec (existing ones only)
-    Phase 4:    changed files + their test counterparts
-    Phase 5-6:  all git-changed files (for review/audit)
+    Phase 4:    changed files + their existing tests (see testmap.py)
+    Phase 5-7:  all git-changed files (for review/audit); with
+                phase.pre_read == "diff" only the diff hunks + outlines
     """
     if phase.number in (0, 8):
         return ""
 
     files_to_read: list[str] = []
+    plan_text = _read_plan(project_dir)
+    diff_sizes: dict[str, int] = {}
 
     if phase.number in (1, 2, 3):
         # Extract file paths from the plan spec
-        specs_dir = project_dir / ".workflow" / "specs"
-        plan_files = list(specs_dir.glob("*plan-consolidated.md")) if specs_dir.exists() else []
-        if plan_files:
-            spec_content = plan_files[0].read_text(encoding="utf-8", errors="replace")
-            all_paths = _extract_file_paths(spec_content)
+        if plan_text:
+            all_paths = _extract_file_paths(plan_text)
 
             # Filter by phase scope
             if phase.number == 1:
@@ -266,34 +534,49 @@ def _pre_read_files(phase: Phase, config: WorkflowConfig, project_dir: Path) ->
                 files_to_read = [p for p in all_paths if p.startswith("frontend/")]
 
     elif phase.number == 4:
-        # Tests: read changed files + find corresponding test files
-        changed = _git_changed_files(project_dir, config.from_branch)
-        for f in changed:
-            files_to_read.append(f)
-            # Auto-find test counterpart
-            if f.endswith(".java") and "/test/" not in f:
-                test_path = f.replace("/main/", "/test/").replace(".java", "Test.java")
-                if test_path not in files_to_read:
-                    files_to_read.append(test_path)
-            elif f.endswith(".ts") and ".spec." not in f:
-                spec_path = f.replace(".ts", ".spec.ts")
-                if spec_path not in files_to_read:
-                    files_to_read.append(spec_path)
+        # Tests: changed files + the existing tests of changed sources,
+        # ranked by how much their sources changed
+        git = git_service(project_dir)
+        changed = git.changed_files(config.from_branch)
+        diff_sizes = dict(git.diff_stat(config.from_branch))
+        test_map = build_test_map(build_file_index(project_dir))
+        sources = [f for f in changed if not is_test_file(f)]
+        files_to_read = list(changed)
+        for test, churn in test_map.ranked(sources, diff_sizes).items():
+            if test not in changed:
+                files_to_read.append(test)
+            diff_sizes[test] = diff_sizes.get(test, 0) + churn
 
     elif phase.number in (5, 6, 7):
         # Security + Review + PR Draft: all changed files
-        files_to_read = _git_changed_files(project_dir, config.from_branch)
+        git = git_service(project_dir)
+        files_to_read = git.changed_files(config.from_branch)
+        if phase.pre_read == "diff":
+            return _read_diff_content(
+                project_dir, files_to_read, plan_text,
+                config.from_branch, phase.diff_context, limit,
+            )
+        diff_sizes = git.diff_stat(config.from_branch)
 
     if not files_to_read:
         return ""
 
-    content = _read_files_content(project_dir, files_to_read)
+    content = _read_files_content(project_dir, files_to_read, plan_text, diff_sizes, limit)
     if not content:
         return ""
 
     return content
 
 
+def _context_focus(config: WorkflowConfig, project_dir: Path) -> ContextFocus:
+    """Relevance signals for ranking structure.md: changes, plan, issue."""
+    return ContextFocus.from_sources(
+        changed=git_service(project_dir).changed_files(config.from_branch),
+        planned=_extract_file_paths(_read_plan(project_dir)),
+        issue_text=f"{config.issue_title}\n{_read_issue(project_dir)}",
+    )
+
+
 def _architecture_update_instructions(phase: Phase, project_dir: Path) -> str:
     """Generate instructions for the agent to update architecture.md."""
     arch_file = project_dir / ".workflow" / "context" / "architecture.md"
@@ -328,15 +611,162 @@ def _architecture_update_instructions(phase: Phase, project_dir: Path) -> str:
     )
 
 
-def build_prompt(
+@dataclass
+class PromptSizes:
+    """Size of each prompt section in characters, in assembly order.
+
+    Keys are stable across runs and layouts (see _LAYOUTS) so metrics can be
+    compared over time.
+    """
+
+    chars: dict[str, int] = field(default_factory=dict)
+
+    def add(self, name: str, chars: int) -> None:
+        self.chars[name] = self.chars.get(name, 0) + chars
+
+    @property
+    def total(self) -> int:
+        return sum(self.chars.values())
+
+    def as_dict(self) -> dict:
+        return {
+            "total": {"chars": self.total, "tokens": estimate_tokens(self.total)},
+            "sections": {
+                name: {"chars": chars, "tokens": estimate_tokens(chars)}
+                for name, chars in self.chars.items()
+            },
+        }
+
+
+@dataclass
+class RetryInfo:
+    """Why the previous attempt of a phase failed, for the retry section."""
+
+    attempt: int
+    max_attempts: int
+    failure: str
+
+
+# Section order per layout. CACHE_FRIENDLY goes from most to least stable:
+# the issue never changes during a run; agent, architecture and phase
+# instructions and the specs are fixed files per phase. Codebase context is
+# regenerated while agents edit the tree, so it follows them, and retries of
+# a phase share everything up to it.
+_LAYOUTS: dict[PromptLayout, tuple[str, ...]] = {
+    PromptLayout.CLASSIC: (
+        "header", "feedback", "codebase_context", "issue", "agent_instructions",
+        "phase_context", "architecture_instructions", "pre_read", "specs", "state",
+        "extra_context", "retry",
+    ),
+    PromptLayout.CACHE_FRIENDLY: (
+        "issue", "agent_instructions", "architecture_instructions", "header",
+        "phase_context", "specs", "codebase_context", "pre_read", "state",
+        "extra_context", "feedback", "retry",
+    ),
+}
+
+
+@dataclass
+class _PromptInputs:
+    """Everything build_prompt reads from disk or git."""
+
+    context: str
+    issue: str
+    agent: str
+    specs: str
+    state: str
+    pre_read: str = ""  # loaded last, sized to what the rest leaves over
+
+
+async def _load_inputs_async(
+    phase: Phase, config: WorkflowConfig, project_dir: Path
+) -> _PromptInputs:
+    """Read all prompt inputs, running the independent reads concurrently in threads."""
+    context, issue, agent, specs, state = await asyncio.gather(
+        asyncio.to_thread(
+            lambda: read_context(project_dir, _context_focus(config, project_dir))
+        ),
+        asyncio.to_thread(_read_issue, project_dir),
+        asyncio.to_thread(_read_agent, phase.agent),
+        asyncio.to_thread(_read_specs, project_dir, phase.number),
+        asyncio.to_thread(_read_state, project_dir),
+    )
+    return _PromptInputs(context, issue, agent, specs, state)
+
+
+def _pre_read_limit(
+    phase: Phase,
+    config: WorkflowConfig,
+    project_dir: Path,
+    inputs: _PromptInputs,
+    feedback: str,
+    extra_context: str,
+    retry: RetryInfo | None,
+) -> int:
+    """Pre-read budget: _PRE_READ_LIMIT, capped by what the total prompt allows."""
+    base = len(_compose_prompt(
+        phase, config, project_dir, inputs, feedback, extra_context, retry
+    ))
+    return max(0, min(_PRE_READ_LIMIT, _PROMPT_CHAR_LIMIT - _PROMPT_MARGIN - base))
+
+
+async def build_prompt_async(
     phase: Phase,
     config: WorkflowConfig,
     project_dir: Path,
     feedback: str = "",
+    sizes: PromptSizes | None = None,
+    extra_context: str = "",
+    retry: RetryInfo | None = None,
 ) -> str:
     """Build the full prompt for a phase's Claude invocation.
 
-    Structure:
+    File and git reads run concurrently in threads, so this never blocks the
+    event loop. ``extra_context`` and ``retry`` become their own sections,
+    placed by ``config.prompt_layout``. If ``sizes`` is given, it is filled
+    with the size of each section.
+    """
+    inputs = await _load_inputs_async(phase, config, project_dir)
+    limit = _pre_read_limit(
+        phase, config, project_dir, inputs, feedback, extra_context, retry
+    )
+    if limit:
+        inputs.pre_read = await asyncio.to_thread(
+            _pre_read_files, phase, config, project_dir, limit
+        )
+    return _compose_prompt(
+        phase, config, project_dir, inputs, feedback, extra_context, retry, sizes
+    )
+
+
+def build_prompt(
+    phase: Phase,
+    config: WorkflowConfig,
+    project_dir: Path,
+    feedback: str = "",
+    sizes: PromptSizes | None = None,
+    extra_context: str = "",
+    retry: RetryInfo | None = None,
+) -> str:
+    """Blocking build_prompt_async, for callers without an event loop."""
+    return asyncio.run(build_prompt_async(
+        phase, config, project_dir, feedback, sizes, extra_context, retry
+    ))
+
+
+def _compose_prompt(
+    phase: Phase,
+    config: WorkflowConfig,
+    project_dir: Path,
+    inputs: _PromptInputs,
+    feedback: str,
+    extra_context: str = "",
+    retry: RetryInfo | None = None,
+    sizes: PromptSizes | None = None,
+) -> str:
+    """Assemble the full prompt for a phase's Claude invocation.
+
+    Sections (CLASSIC order; see _LAYOUTS for CACHE_FRIENDLY):
     1. Phase header + metadata
     1b. USER CORRECTION (if feedback — injected early for maximum visibility)
     2. Codebase Context (structure.md + architecture.md)
@@ -346,8 +776,12 @@ def build_prompt(
     6. Architecture update instructions
     7. Existing specs from previous phases
     8. Current workflow state
+    9. Additional context from the orchestrator
+    10. RETRY (if a previous attempt failed verification)
     """
     issue_num = str(config.issue_num)
+    layout = config.prompt_layout
+    sections: dict[str, list[str]] = {}
 
     parts: list[str] = [
         f"# Phase {phase.number}: {phase.name}",
@@ -357,10 +791,12 @@ def build_prompt(
         f"Target Coverage: {config.target_coverage}%",
         f"Project directory: {project_dir}",
     ]
+    sections["header"], parts = parts, []
 
-    # Inject user feedback EARLY — right after the header, before all other content.
-    # This ensures the agent sees the correction before reading the codebase context,
-    # issue, or agent instructions, preventing it from forming wrong assumptions first.
+    # CLASSIC injects user feedback EARLY — right after the header, before all other
+    # content. This ensures the agent sees the correction before reading the codebase
+    # context, issue, or agent instructions, preventing it from forming wrong
+    # assumptions first. CACHE_FRIENDLY moves it to the end, next to the retry block.
     if feedback:
         parts.extend([
             "",
@@ -374,18 +810,24 @@ def build_prompt(
             "Your output will be rejected if it does not address the above feedback.",
         ])
 
-    # 1. Codebase context (structure + architecture)
-    context = read_context(project_dir)
+    sections["feedback"], parts = parts, []
+
+    # 1. Codebase context (structure ranked + trimmed to budget, architecture)
+    context = inputs.context
     if context:
         parts.extend(["", "## Codebase Context", context])
 
+    sections["codebase_context"], parts = parts, []
+
     # 2. Issue context
-    issue_text = _read_issue(project_dir)
+    issue_text = inputs.issue
     if issue_text:
         parts.extend(["", "## GitHub Issue", issue_text])
 
+    sections["issue"], parts = parts, []
+
     # 3. Agent definition (full persona from agents/*.md)
-    agent_body = _read_agent(phase.agent)
+    agent_body = inputs.agent
     if agent_body:
         parts.extend(["", "## Agent Instructions", agent_body])
     else:
@@ -396,14 +838,16 @@ def build_prompt(
             fallback = fallback.replace("{from_branch}", config.from_branch)
             parts.extend(["", "## Your Task", fallback])
 
+    sections["agent_instructions"], parts = parts, []
+
     # 4. Phase-specific context
     phase_context: list[str] = []
     phase_context.append(f"Issue number for file naming: {issue_num}")
     phase_context.append(f"Scope: {config.scope.value}")
 
     if phase.number == 0:
-        sections = _scope_sections(config.scope)
-        phase_context.append(f"Plan must cover:{sections}")
+        scope_sections = _scope_sections(config.scope)
+        phase_context.append(f"Plan must cover:{scope_sections}")
         phase_context.append(
             f"Write plan to: .workflow/specs/issue-{issue_num}-plan-consolidated.md"
         )
@@ -546,13 +990,17 @@ def build_prompt(
             "Write as prose, not bullet points. Keep it concise but informative.",
         ])
 
+    sections["phase_context"], parts = parts, []
+
     # 6. Architecture update instructions (tells agent to update architecture.md)
     arch_instructions = _architecture_update_instructions(phase, project_dir)
     if arch_instructions:
         parts.append(arch_instructions)
 
+    sections["architecture_instructions"], parts = parts, []
+
     # 6. Pre-read files (reduces agent exploration turns)
-    pre_read = _pre_read_files(phase, config, project_dir)
+    pre_read = inputs.pre_read
     if pre_read:
         parts.extend([
             "",
@@ -562,14 +1010,81 @@ def build_prompt(
             pre_read,
         ])
 
-    # 7. Specs from previous phases
-    specs = _read_specs(project_dir)
+    sections["pre_read"], parts = parts, []
+
+    # 7. Specs from previous phases (full text where needed, digests otherwise)
+    specs = inputs.specs
     if specs:
         parts.extend(["", "## Existing Specs (from previous phases)", specs])
 
+    sections["specs"], parts = parts, []
+
     # 8. Workflow state
-    state = _read_state(project_dir)
+    state = inputs.state
+    if state and layout is PromptLayout.CACHE_FRIENDLY:
+        state = _canonical_json(state)
     if state:
         parts.extend(["", "## Current Workflow State", f"```json\n{state}\n```"])
+    sections["state"], parts = parts, []
 
+    # 9. Additional context (e.g. approved plan notes from the orchestrator)
+    if extra_context:
+        parts.extend(["", "## Additional Context", extra_context])
+    sections["extra_context"], parts = parts, []
+
+    # 10. On retry: the verification error, so the agent knows what went wrong
+    if retry:
+        parts.extend(["", *_retry_section(retry)])
+    sections["retry"], parts = parts, []
+
+    return _assemble(sections, layout, sizes)
+
+
+def _retry_section(retry: RetryInfo) -> list[str]:
+    return [
+        "## RETRY — Previous Attempt Failed",
+        f"This is attempt {retry.attempt}/{retry.max_attempts}. "
+        f"The previous attempt failed verification:\n\n"
+        f"**Error:** {retry.failure}\n\n"
+        f"Fix this issue before completing your work. "
+        f"Make sure all required output files are written.",
+    ]
+
+
+def build_resume_prompt(retry: RetryInfo, sizes: PromptSizes | None = None) -> str:
+    """The next turn for a resumed session: only the verification error.
+
+    The session already holds the full phase prompt and everything the agent
+    read, so the retry needs no rebuilt context.
+    """
+    prompt = "\n".join(_retry_section(retry))
+    if sizes is not None:
+        sizes.add("retry", len(prompt) + 1)
+    return prompt
+
+
+def _canonical_json(text: str) -> str:
+    """Deterministic JSON (sorted keys, fixed indent); text as-is if not JSON."""
+    try:
+        return json.dumps(json.loads(text), sort_keys=True, indent=2, ensure_ascii=False)
+    except ValueError:
+        return text
+
+
+def _assemble(
+    sections: dict[str, list[str]], layout: PromptLayout, sizes: PromptSizes | None
+) -> str:
+    """Join sections in layout order, recording each section's size."""
+    parts: list[str] = []
+    for name in _LAYOUTS[layout]:
+        section = sections.get(name, [])
+        if section and layout is not PromptLayout.CLASSIC:
+            # Sections are written to follow the header; re-separate when moved
+            if not parts:
+                section = section[1:] if section[0] == "" else section
+            elif section[0] != "" and not section[0].startswith("\n"):
+                section = ["", *section]
+        if sizes is not None:
+            sizes.add(name, sum(len(p) + 1 for p in section))
+        parts.extend(section)
     return "\n".join(parts)
@@ -0,0 +1,255 @@
+"""Compressed, rotated and indexed raw stream logs.
+
+Each attempt of a phase writes its stream-json lines to its own segments,
+``phase-<n>-<agent>.a<attempt>.<segment>.jsonl.gz`` (``.zst`` with the
+optional zstandard package — ``pip install bytcode[zstd]``). A segment is
+rotated once it holds _SEGMENT_CHARS of uncompressed text. Every LogWriter
+batch becomes one independent gzip member / zstd frame, so a reader can
+start decompressing at any batch boundary.
+
+``phase-<n>-<agent>.index.json`` records per attempt the segments and, per
+event type, where each event starts: (segment, compressed offset of its
+batch, uncompressed offset within the batch, line number). Tools jump to
+"attempt 2, result event" without decompressing anything before it:
+
+    python -m bytcode.rawlog .workflow/logs/phase-5-security-auditor --attempt 2 --type result
+"""
+
+import argparse
+import gzip
+import io
+import json
+import os
+import sys
+from pathlib import Path
+from typing import IO, Iterator
+
+from .streamjson import event_type as sniff_event_type
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+# Start a new segment after this much uncompressed text
+_SEGMENT_CHARS = 64 * 1024 * 1024
+# Indexed positions per event type and attempt (later events are only counted)
+_MAX_INDEXED = 5_000
+_GZIP_LEVEL = 6
+_ZSTD_LEVEL = 3
+
+
+def _codec() -> str:
+    return "zst" if zstandard is not None else "gz"
+
+
+def _compress(data: bytes, codec: str) -> bytes:
+    if codec == "zst":
+        return zstandard.ZstdCompressor(level=_ZSTD_LEVEL).compress(data)
+    return gzip.compress(data, compresslevel=_GZIP_LEVEL, mtime=0)
+
+
+def _decompressed(raw: IO[bytes], codec: str) -> IO[bytes]:
+    """Stream reader over consecutive members/frames starting at raw's position."""
+    if codec == "zst":
+        if zstandard is None:
+            raise RuntimeError("zstd log segments need the zstandard package")
+        return zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True)
+    return gzip.GzipFile(fileobj=raw, mode="rb")
+
+
+def index_path(logs_dir: Path, stem: str) -> Path:
+    return logs_dir / f"{stem}.index.json"
+
+
+def load_index(logs_dir: Path, stem: str) -> dict:
+    try:
+        return json.loads(index_path(logs_dir, stem).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {"attempts": {}}
+
+
+def remove_raw_logs(logs_dir: Path, stem: str) -> None:
+    """Delete all segments and the index of a phase (and a legacy .jsonl)."""
+    for path in (
+        *logs_dir.glob(f"{stem}.a*.jsonl.*"),
+        index_path(logs_dir, stem),
+        logs_dir / f"{stem}.jsonl",
+    ):
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+
+class CompressedLogSink:
+    """LogWriter sink for one attempt's raw stream: compressed segments + index."""
+
+    def __init__(
+        self, logs_dir: Path, stem: str, attempt: int, segment_chars: int = _SEGMENT_CHARS
+    ):
+        self.name = f"{stem}.a{attempt}"
+        self.logs_dir = logs_dir
+        self.stem = stem
+        self.attempt = attempt
+        self.codec = _codec()
+        self.segment_chars = segment_chars
+        self.segments: list[str] = []
+        self.lines = 0
+        self.counts: dict[str, int] = {}
+        self.events: dict[str, list[list[int]]] = {}
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+        self._file: IO[bytes] | None = None
+        self._segment_chars = 0
+        self._rotate()
+
+    def _rotate(self) -> None:
+        if self._file:
+            self._file.close()
+        name = f"{self.name}.{len(self.segments):03d}.jsonl.{self.codec}"
+        self.segments.append(name)
+        self._file = open(self.logs_dir / name, "wb")
+        self._segment_chars = 0
+
+    def write_batch(self, items: list[str]) -> None:
+        assert self._file is not None
+        if self._segment_chars >= self.segment_chars:
+            self._rotate()
+        segment = len(self.segments) - 1
+        offset = self._file.tell()
+        data = io.BytesIO()
+        for item in items:
+            encoded = item.encode("utf-8")
+            event_type = sniff_event_type(item) or "other"
+            count = self.counts.get(event_type, 0)
+            self.counts[event_type] = count + 1
+            if count < _MAX_INDEXED:
+                self.events.setdefault(event_type, []).append(
+                    [segment, offset, data.tell(), self.lines]
+                )
+            data.write(encoded)
+            self.lines += item.count("\n")
+        raw = data.getvalue()
+        compressed = _compress(raw, self.codec)
+        self._file.write(compressed)
+        self._file.flush()
+        self._segment_chars += len(raw)
+        self.raw_bytes += len(raw)
+        self.compressed_bytes += len(compressed)
+
+    def close(self, fsync: bool) -> None:
+        if self._file:
+            try:
+                if fsync:
+                    os.fsync(self._file.fileno())
+            except OSError:
+                pass
+            finally:
+                self._file.close()
+                self._file = None
+        self._write_index(fsync)
+
+    def _write_index(self, fsync: bool) -> None:
+        index = load_index(self.logs_dir, self.stem)
+        index["attempts"][str(self.attempt)] = {
+            "codec": self.codec,
+            "segments": self.segments,
+            "lines": self.lines,
+            "raw_bytes": self.raw_bytes,
+            "compressed_bytes": self.compressed_bytes,
+            "counts": self.counts,
+            "events": self.events,
+        }
+        path = index_path(self.logs_dir, self.stem)
+        tmp = path.with_suffix(".tmp")
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(index, f, separators=(",", ":"))
+                if fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            tmp.replace(path)
+        except OSError:
+            pass  # segments are still readable in full without the index
+
+
+def read_events(
+    logs_dir: Path, stem: str, attempt: int, event_type: str | None = None
+) -> Iterator[str]:
+    """Raw stream-json lines of an attempt, optionally only one event type.
+
+    With event_type, each indexed event is read by seeking to its batch; past
+    _MAX_INDEXED events of that type, the remaining segments are scanned.
+    """
+    entry = load_index(logs_dir, stem)["attempts"].get(str(attempt))
+    if not entry:
+        return
+    codec = entry["codec"]
+    segments = entry["segments"]
+
+    if event_type is None:
+        for name in segments:
+            with open(logs_dir / name, "rb") as raw, _decompressed(raw, codec) as stream:
+                for line in io.TextIOWrapper(stream, encoding="utf-8", errors="replace"):
+                    yield line.rstrip("\n")
+        return
+
+    positions = entry["events"].get(event_type, [])
+    for segment, offset, skip, _ in positions:
+        with open(logs_dir / segments[segment], "rb") as raw:
+            raw.seek(offset)
+            with _decompressed(raw, codec) as stream:
+                stream.read(skip)
+                yield stream.readline().decode("utf-8", errors="replace").rstrip("\n")
+
+    if entry["counts"].get(event_type, 0) > len(positions):
+        # Index is capped: scan from the last indexed event onwards
+        segment, offset, skip, _ = positions[-1]
+        for i in range(segment, len(segments)):
+            with open(logs_dir / segments[i], "rb") as raw:
+                raw.seek(offset if i == segment else 0)
+                with _decompressed(raw, codec) as stream:
+                    if i == segment:
+                        stream.read(skip)
+                        stream.readline()  # already yielded
+                    for line in io.TextIOWrapper(stream, encoding="utf-8", errors="replace"):
+                        if sniff_event_type(line) == event_type:
+                            yield line.rstrip("\n")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m bytcode.rawlog",
+        description="Print raw stream-json events from compressed phase logs",
+    )
+    parser.add_argument(
+        "log", type=Path, help="Log stem, e.g. .workflow/logs/phase-5-security-auditor"
+    )
+    parser.add_argument("--attempt", type=int, help="Attempt number (default: all)")
+    parser.add_argument("--type", dest="event_type", help="Only this event type, e.g. result")
+    parser.add_argument("--summary", action="store_true", help="Show index summary only")
+    args = parser.parse_args(argv)
+
+    logs_dir, stem = args.log.parent, args.log.name
+    attempts = load_index(logs_dir, stem)["attempts"]
+    if not attempts:
+        print(f"No index for {args.log}", file=sys.stderr)
+        return 1
+    selected = [str(args.attempt)] if args.attempt else sorted(attempts, key=int)
+    for attempt in selected:
+        if args.summary:
+            entry = attempts.get(attempt, {})
+            print(
+                f"attempt {attempt}: {entry.get('lines', 0)} lines, "
+                f"{entry.get('raw_bytes', 0):,} -> {entry.get('compressed_bytes', 0):,} bytes, "
+                f"{len(entry.get('segments', []))} segment(s), events {entry.get('counts', {})}"
+            )
+            continue
+        for line in read_events(logs_dir, stem, int(attempt), args.event_type):
+            print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
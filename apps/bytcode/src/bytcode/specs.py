@@ -0,0 +1,127 @@
+"""Spec files (.workflow/specs/*.md) and their compact digests.
+
+Each spec written by a phase agent gets a digest in .workflow/specs/digests/
+with the same name: its summary, the files it touches and its open issues.
+Digests are (re)built lazily when missing or older than the spec.
+"""
+
+import re
+from pathlib import Path
+
+from .filecache import read_cached
+
+_DIGEST_DIR = "digests"
+
+# Summary sections, in order of preference
+_SUMMARY_HEADINGS = ("Phase Summary", "Executive Summary", "Architecture Overview")
+# Max characters of summary kept in a digest
+_SUMMARY_CHARS = 1_200
+# Max files listed in a digest
+_DIGEST_FILES = 25
+# Max open-issue lines in a digest
+_DIGEST_ISSUES = 10
+
+# Headings whose content counts as open issues (English + German spec templates)
+_ISSUE_HEADING_RE = re.compile(
+    r"^#{2,4}\s+.*\b(open|offen|risk|risik|finding|issue|todo|problem|known|"
+    r"blocker|question|frage|recommend|empfehl)",
+    re.IGNORECASE,
+)
+_HEADING_RE = re.compile(r"^#{1,4}\s")
+_FILE_PATH_RE = re.compile(r"(?:backend|frontend)/[\w/.-]+\.\w+")
+_PHASE_RE = re.compile(r"-ph(\d+)-")
+
+
+def extract_section(markdown: str, heading: str) -> str:
+    """Extract content under a ## heading, stopping at the next ## heading."""
+    pattern = rf"^##\s+{re.escape(heading)}\s*$"
+    lines = markdown.splitlines()
+    start = None
+    for i, line in enumerate(lines):
+        if re.match(pattern, line, re.IGNORECASE):
+            start = i + 1
+            break
+    if start is None:
+        return ""
+    result: list[str] = []
+    for line in lines[start:]:
+        if line.startswith("## "):
+            break
+        result.append(line)
+    # Strip leading/trailing blank lines
+    text = "\n".join(result).strip()
+    return text
+
+
+def spec_phase(name: str) -> int | None:
+    """Phase that wrote a spec file: 0 for the plan, N for ``*-phNN-*``."""
+    if "plan-consolidated" in name:
+        return 0
+    match = _PHASE_RE.search(name)
+    return int(match.group(1)) if match else None
+
+
+def _open_issues(content: str) -> list[str]:
+    issues: list[str] = []
+    capturing = False
+    for line in content.splitlines():
+        if _HEADING_RE.match(line):
+            capturing = bool(_ISSUE_HEADING_RE.match(line))
+            continue
+        stripped = line.strip()
+        if stripped.startswith("- [ ]") or (
+            capturing and stripped.startswith(("-", "*", "|")) and not set(stripped) <= set("|-: ")
+        ):
+            issues.append(stripped)
+            if len(issues) >= _DIGEST_ISSUES:
+                break
+    return issues
+
+
+def build_digest(content: str) -> str:
+    """Compact digest of a spec: summary, files touched, open issues."""
+    summary = ""
+    for heading in _SUMMARY_HEADINGS:
+        summary = extract_section(content, heading)
+        if summary:
+            break
+    if not summary:
+        # No summary section: first paragraph after the title
+        body = re.sub(r"\A#[^\n]*\n", "", content.strip())
+        summary = body.split("\n\n", 1)[0].strip()
+    if len(summary) > _SUMMARY_CHARS:
+        summary = summary[:_SUMMARY_CHARS].rsplit(" ", 1)[0] + " ..."
+
+    files = list(dict.fromkeys(_FILE_PATH_RE.findall(content)))
+    lines = [f"**Summary:** {summary}" if summary else "**Summary:** _(none)_"]
+    if files:
+        shown = ", ".join(f"`{f}`" for f in files[:_DIGEST_FILES])
+        more = f" (+{len(files) - _DIGEST_FILES} more)" if len(files) > _DIGEST_FILES else ""
+        lines.append(f"**Files:** {shown}{more}")
+    issues = _open_issues(content)
+    if issues:
+        lines.append("**Open issues:**")
+        lines.extend(issues)
+    return "\n".join(lines)
+
+
+def spec_digest(spec_file: Path) -> str:
+    """Digest of a spec, regenerated into digests/ if missing or stale."""
+    digest_file = spec_file.parent / _DIGEST_DIR / spec_file.name
+    try:
+        fresh = digest_file.stat().st_mtime_ns >= spec_file.stat().st_mtime_ns
+    except OSError:
+        fresh = False
+    if fresh:
+        cached = read_cached(digest_file)
+        if cached is not None:
+            return cached
+
+    content = read_cached(spec_file) or ""
+    digest = build_digest(content)
+    try:
+        digest_file.parent.mkdir(exist_ok=True)
+        digest_file.write_text(digest, encoding="utf-8")
+    except OSError:
+        pass  # digest is still usable in memory
+    return digest
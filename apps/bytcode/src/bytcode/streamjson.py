@@ -0,0 +1,39 @@
+"""Cheap handling of claude's ``--output-format stream-json`` lines.
+
+Most bytes in a stream are ``user`` events carrying tool results (file
+contents, command output) that bytcode only logs. event_type() reads the
+type from the line prefix without decoding it, so such events are never
+parsed; loads() decodes the rest, with orjson when installed —
+``pip install bytcode[json]``.
+"""
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+# claude writes each event with "type" as its first key
+_PREFIX = '{"type":"'
+
+
+def event_type(line: str) -> str | None:
+    """The event's ``type`` if the line starts with it, else None.
+
+    Only the anchored prefix is trusted: a "type" key further in may belong
+    to a nested object, so callers decode lines that return None.
+    """
+    if line.startswith(_PREFIX):
+        end = line.find('"', len(_PREFIX))
+        if end != -1:
+            return line[len(_PREFIX):end]
+    return None
+
+
+def loads(line: str) -> Any:
+    """Decode one JSON line (orjson if available). Raises ValueError if invalid."""
+    if orjson is not None:
+        return orjson.loads(line)
+    return json.loads(line)
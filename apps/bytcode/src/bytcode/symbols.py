@@ -0,0 +1,607 @@
+"""Persistent symbol index for codebase context.
+
+Holds what structure.md is rendered from: Java entities with fields, Spring
+routes, Angular components/services/models and Flyway migrations. Stored as
+SQLite in .workflow/context/symbols.db, keyed by path and content hash, so it
+is updated incrementally and reused across issues in the same project.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from pathlib import Path, PurePosixPath
+
+_MAPPING_RE = re.compile(r"@(Request|Get|Post|Put|Delete|Patch)Mapping\b")
+_JAVA_COMMENT_RE = re.compile(r'("(?:\\.|[^"\\\n])*")|//[^\n]*|/\*.*?\*/', re.DOTALL)
+_JAVA_TYPE_DECL_RE = re.compile(r"\b(?:class|interface)\s+\w+")
+_JAVA_ENTITY_DECL_RE = re.compile(r"\b(class|record)\s+(\w+)")
+_JAVA_STRING_RE = re.compile(r'"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\'')
+_ANNOTATION_RE = re.compile(r"@([\w.]+)")
+_TS_EXPORT_RE = re.compile(r"export\s+(?:abstract\s+)?(?:class|interface|type|enum)\s+(\w+)")
+_NG_SELECTOR_RE = re.compile(r"selector\s*:\s*['\"`]([^'\"`]+)['\"`]")
+_MIGRATION_RE = re.compile(r"V([\d._]+)__(.+)\.sql$")
+
+# Field annotations reported next to the field type in the entity summary
+_RELATION_ANNOTATIONS = {
+    "Id", "EmbeddedId", "ManyToOne", "OneToMany", "OneToOne", "ManyToMany",
+    "Embedded", "ElementCollection",
+}
+_FIELD_MODIFIERS = {"private", "protected", "public", "final", "transient", "volatile"}
+
+# Worker threads for per-file source parsing (I/O bound)
+_PARSE_WORKERS = min(8, (os.cpu_count() or 1) + 4)
+
+# Batches at least this large are parsed in a process pool instead
+_PROCESS_POOL_MIN = 500
+
+# Bump when the schema, the parsers or the rendered section format change —
+# forces a full re-index
+_SCHEMA_VERSION = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, hash TEXT
+);
+CREATE TABLE IF NOT EXISTS fields (
+    path TEXT, position INTEGER, entity TEXT, name TEXT, type TEXT, relation TEXT
+);
+CREATE TABLE IF NOT EXISTS routes (
+    path TEXT, position INTEGER, controller TEXT, route TEXT
+);
+CREATE TABLE IF NOT EXISTS frontend (
+    path TEXT, kind TEXT, name TEXT, selector TEXT
+);
+CREATE TABLE IF NOT EXISTS migrations (
+    path TEXT PRIMARY KEY, version TEXT, description TEXT
+);
+CREATE TABLE IF NOT EXISTS sections (
+    name TEXT PRIMARY KEY, content TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_fields_path ON fields(path);
+CREATE INDEX IF NOT EXISTS idx_routes_path ON routes(path);
+CREATE INDEX IF NOT EXISTS idx_frontend_path ON frontend(path);
+"""
+
+_SYMBOL_TABLES = ("fields", "routes", "frontend", "migrations")
+
+
+def is_entity_file(rel: str) -> bool:
+    """Java source in an entity/ or model/ package (tests excluded)."""
+    parts = rel.split("/")
+    return (
+        len(parts) >= 2
+        and parts[-2] in ("entity", "model")
+        and parts[-1].endswith(".java")
+        and "Test" not in parts[-1]
+    )
+
+
+def frontend_kind(rel: str) -> str:
+    """Angular artifact kind of a file: component, service, model or ""."""
+    name = PurePosixPath(rel).name
+    if ".spec." in name:
+        return ""
+    if name.endswith(".component.ts"):
+        return "component"
+    if name.endswith(".service.ts"):
+        return "service"
+    if name.endswith(".model.ts"):
+        return "model"
+    return ""
+
+
+def is_migration_file(rel: str) -> bool:
+    return bool(_MIGRATION_RE.match(PurePosixPath(rel).name))
+
+
+def is_java_source(rel: str) -> bool:
+    """Java main source (routes are never taken from test sources)."""
+    return rel.endswith(".java") and "/src/test/" not in f"/{rel}"
+
+
+def _strip_java_comments(source: str) -> str:
+    """Remove // and /* */ comments while leaving string literals intact."""
+    return _JAVA_COMMENT_RE.sub(
+        lambda m: m.group(1) if m.group(1) else " ", source
+    )
+
+
+def _split_top_level(text: str, sep: str = ",", generics: bool = False) -> list[str]:
+    """Split on *sep* outside of braces, parentheses and string literals.
+
+    With *generics*, angle brackets count as nesting too (type arguments).
+    """
+    opening = "({<" if generics else "({"
+    closing = ")}>" if generics else ")}"
+    parts: list[str] = []
+    depth = 0
+    in_str = False
+    current: list[str] = []
+    prev = ""
+    for ch in text:
+        if ch == '"' and prev != "\\":
+            in_str = not in_str
+        elif not in_str:
+            if ch in opening:
+                depth += 1
+            elif ch in closing:
+                depth -= 1
+            elif ch == sep and depth == 0:
+                parts.append("".join(current))
+                current = []
+                prev = ch
+                continue
+        current.append(ch)
+        prev = ch
+    parts.append("".join(current))
+    return [p.strip() for p in parts if p.strip()]
+
+
+def _annotation_values(value: str) -> list[str]:
+    """Values of an annotation attribute: "x", {"a", "b"} or a constant."""
+    value = value.strip()
+    if value.startswith("{") and value.endswith("}"):
+        items = _split_top_level(value[1:-1])
+    else:
+        items = [value]
+    result: list[str] = []
+    for item in items:
+        if item.startswith('"') and item.endswith('"') and len(item) >= 2:
+            result.append(item[1:-1])
+        else:
+            result.append("{" + item + "}")  # constant reference, keep readable
+    return result
+
+
+def _mapping_args(args: str) -> tuple[list[str], list[str]]:
+    """Parse mapping annotation arguments into (paths, http_methods)."""
+    paths: list[str] = []
+    methods: list[str] = []
+    for part in _split_top_level(args):
+        key, eq, value = part.partition("=")
+        if not eq or key.strip().startswith('"') or key.strip().startswith("{"):
+            key, value = "value", part
+        key = key.strip()
+        if key in ("value", "path"):
+            paths.extend(_annotation_values(value))
+        elif key == "method":
+            methods.extend(
+                v.strip("{}").rsplit(".", 1)[-1] for v in _annotation_values(value)
+            )
+    return paths or [""], methods
+
+
+def _find_mappings(source: str) -> list[tuple[int, str, str]]:
+    """Locate mapping annotations: (offset, verb, raw_args)."""
+    found: list[tuple[int, str, str]] = []
+    for m in _MAPPING_RE.finditer(source):
+        pos = m.end()
+        while pos < len(source) and source[pos] in " \t\r\n":
+            pos += 1
+        args = ""
+        if pos < len(source) and source[pos] == "(":
+            depth = 0
+            for end in range(pos, len(source)):
+                if source[end] == "(":
+                    depth += 1
+                elif source[end] == ")":
+                    depth -= 1
+                    if depth == 0:
+                        args = source[pos + 1:end]
+                        break
+        found.append((m.start(), m.group(1), args))
+    return found
+
+
+def _join_route(base: str, path: str) -> str:
+    joined = "/".join(p.strip("/") for p in (base, path) if p.strip("/"))
+    return "/" + joined
+
+
+def parse_routes(content: str) -> list[str]:
+    """Extract full ``METHOD /path`` routes from a Spring controller source.
+
+    The class-level @RequestMapping path(s) are combined with every
+    method-level mapping. Annotations before the first class/interface
+    declaration count as class-level.
+    """
+    if "Mapping" not in content:
+        return []
+
+    source = _strip_java_comments(content)
+    decl = _JAVA_TYPE_DECL_RE.search(source)
+    class_start = decl.start() if decl else 0
+
+    bases: list[str] = [""]
+    routes: list[str] = []
+    for offset, verb, args in _find_mappings(source):
+        paths, methods = _mapping_args(args)
+        if offset < class_start:
+            if verb == "Request":
+                bases = paths
+            continue
+        if verb != "Request":
+            methods = [verb.upper()]
+        elif not methods:
+            methods = ["ANY"]
+        for base in bases:
+            for path in paths:
+                for method in methods:
+                    route = f"{method} {_join_route(base, path)}"
+                    if route not in routes:
+                        routes.append(route)
+    return routes
+
+
+def _blank_strings(source: str) -> str:
+    """Empty string/char literals so their content cannot confuse the tokenizer."""
+    return _JAVA_STRING_RE.sub(lambda m: m.group(0)[0] * 2, source)
+
+
+def _matching(source: str, start: int, open_ch: str, close_ch: str) -> int:
+    """Index of the bracket closing the one at *start* (or len(source))."""
+    depth = 0
+    for i in range(start, len(source)):
+        if source[i] == open_ch:
+            depth += 1
+        elif source[i] == close_ch:
+            depth -= 1
+            if depth == 0:
+                return i
+    return len(source)
+
+
+def _strip_annotations(text: str) -> tuple[list[str], str]:
+    """Split leading/inline annotations (with arguments) off a declaration."""
+    names: list[str] = []
+    rest: list[str] = []
+    pos = 0
+    for m in _ANNOTATION_RE.finditer(text):
+        if m.start() < pos:
+            continue
+        rest.append(text[pos:m.start()])
+        names.append(m.group(1).rsplit(".", 1)[-1])
+        pos = m.end()
+        after = pos
+        while after < len(text) and text[after].isspace():
+            after += 1
+        if after < len(text) and text[after] == "(":
+            pos = _matching(text, after, "(", ")") + 1
+    rest.append(text[pos:])
+    return names, " ".join("".join(rest).split())
+
+
+def _parse_declaration(text: str, annotations: list[str]) -> tuple[str, str, str] | None:
+    """``[modifiers] Type name [= init]`` -> (name, type, relation)."""
+    text = text.split("=", 1)[0].strip()
+    words = text.split(" ")
+    while words and words[0] in _FIELD_MODIFIERS:
+        words.pop(0)
+    decl = " ".join(words)
+    m = re.match(r"(.+?)\s*\b(\w+)\s*((?:\[\s*\])*)$", decl)
+    if not m or not m.group(1).strip():
+        return None
+    typ = re.sub(r"\s*([<>,\[\]])\s*", r"\1", m.group(1).strip()) + m.group(3).replace(" ", "")
+    relation = next((a for a in annotations if a in _RELATION_ANNOTATIONS), "")
+    return m.group(2), typ, relation
+
+
+def _parse_field_statement(stmt: str) -> list[tuple[str, str, str]]:
+    """Fields declared by one ``;``-terminated class-body statement."""
+    annotations, rest = _strip_annotations(stmt)
+    if not rest:
+        return []
+    head = rest.split("=", 1)[0]
+    if "(" in head or head.split(" ", 1)[0] in ("import", "package", "return"):
+        return []  # abstract/interface method, not a field
+    if "static" in head.split(" "):
+        return []
+
+    declarators = _split_top_level(rest, generics=True)
+    if not declarators:
+        return []
+    parsed = _parse_declaration(declarators[0], annotations)
+    if parsed is None:
+        return []
+    fields = [parsed]
+    for extra in declarators[1:]:
+        name = extra.split("=", 1)[0].strip().split(" ")[-1].strip("[]")
+        if name.isidentifier():
+            fields.append((name, parsed[1], parsed[2]))
+    return fields
+
+
+def _class_body_fields(source: str, body_start: int) -> list[tuple[str, str, str]]:
+    """Walk a class body at depth 1, collecting field statements.
+
+    Method bodies, constructors, nested types and initializer blocks are
+    skipped as a whole; braces inside annotation arguments or field
+    initializers stay part of their statement.
+    """
+    fields: list[tuple[str, str, str]] = []
+    i = body_start + 1
+    stmt_start = i
+    paren = 0
+    while i < len(source):
+        ch = source[i]
+        if ch == "(":
+            paren += 1
+        elif ch == ")":
+            paren -= 1
+        elif ch == "{":
+            end = _matching(source, i, "{", "}")
+            _, head = _strip_annotations(source[stmt_start:i])
+            if paren == 0 and "=" not in head:
+                stmt_start = end + 1  # member body: method, nested type, block
+            i = end + 1
+            continue
+        elif ch == "}" and paren == 0:
+            break  # end of class body
+        elif ch == ";" and paren == 0:
+            fields.extend(_parse_field_statement(source[stmt_start:i]))
+            stmt_start = i + 1
+        i += 1
+    return fields
+
+
+def parse_entity_fields(content: str) -> list[tuple[str, str, str]]:
+    """Parse the fields of a Java entity/model class or record.
+
+    Returns (name, type, relation) per non-static field, where relation is
+    a JPA annotation such as ManyToOne or Id (empty if none). Handles
+    multi-line and multi-variable declarations, annotations with arguments,
+    generic types, records and classes without explicit ``private``.
+    """
+    source = _blank_strings(_strip_java_comments(content))
+    decl = _JAVA_ENTITY_DECL_RE.search(source)
+    if not decl:
+        return []
+
+    open_ch = "(" if decl.group(1) == "record" else "{"
+    start = source.find(open_ch, decl.end())
+    if start < 0:
+        return []
+    if open_ch == "{":
+        return _class_body_fields(source, start)
+
+    fields: list[tuple[str, str, str]] = []
+    header = source[start + 1:_matching(source, start, "(", ")")]
+    for component in _split_top_level(header, generics=True):
+        annotations, rest = _strip_annotations(component)
+        parsed = _parse_declaration(rest, annotations)
+        if parsed:
+            fields.append(parsed)
+    return fields
+
+
+@dataclass
+class FileSymbols:
+    """Symbols extracted from one file."""
+
+    path: str
+    hash: str
+    fields: list[tuple[str, str, str, str]] = field(default_factory=list)  # (entity, name, type, relation)
+    routes: list[tuple[str, str]] = field(default_factory=list)  # (controller, route)
+    frontend: list[tuple[str, str, str]] = field(default_factory=list)  # (kind, name, selector)
+    migration: tuple[str, str] | None = None  # (version, description)
+
+
+def extract_symbols(rel: str, content: str, digest: str) -> FileSymbols:
+    """Run every parser that applies to *rel* over its content."""
+    symbols = FileSymbols(rel, digest)
+    stem = PurePosixPath(rel).stem
+
+    if is_entity_file(rel):
+        symbols.fields = [(stem, *f) for f in parse_entity_fields(content)]
+    if is_java_source(rel):
+        symbols.routes = [(stem, r) for r in parse_routes(content)]
+
+    kind = frontend_kind(rel)
+    if kind:
+        names = _TS_EXPORT_RE.findall(content) or [stem]
+        selector = ""
+        if kind == "component":
+            m = _NG_SELECTOR_RE.search(content)
+            selector = m.group(1) if m else ""
+            names = names[:1]
+        for name in names:
+            symbols.frontend.append((kind, name, selector))
+
+    m = _MIGRATION_RE.match(PurePosixPath(rel).name)
+    if m:
+        symbols.migration = (m.group(1).replace("_", "."), m.group(2).replace("_", " "))
+
+    return symbols
+
+
+def _load_symbols(job: tuple[str, str, str]) -> FileSymbols | None:
+    """Read, hash and (if the hash moved) parse one file.
+
+    Top-level so it can run in a worker process. *job* is
+    (root, rel, previous_hash).
+    """
+    root, rel, prev_hash = job
+    try:
+        data = (Path(root) / rel).read_bytes()
+    except OSError:
+        return None
+    digest = hashlib.sha1(data).hexdigest()
+    if digest == prev_hash:
+        return FileSymbols(rel, digest)  # touched, content unchanged
+    return extract_symbols(rel, data.decode("utf-8", errors="replace"), digest)
+
+
+def _parse_all(jobs: list[tuple[str, str, str]]) -> list[FileSymbols | None]:
+    """Run _load_symbols over *jobs*, streaming them through a worker pool.
+
+    Large batches (a first index of a big backend) go to a process pool so
+    parsing is not serialized by the GIL; small incremental batches use
+    threads to avoid process start-up cost.
+    """
+    if len(jobs) >= _PROCESS_POOL_MIN:
+        try:
+            ctx = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(mp_context=ctx) as pool:
+                return list(pool.map(_load_symbols, jobs, chunksize=32))
+        except (OSError, BrokenProcessPool):
+            pass  # fall back to threads
+    with ThreadPoolExecutor(max_workers=_PARSE_WORKERS) as pool:
+        return list(pool.map(_load_symbols, jobs))
+
+
+class SymbolIndex:
+    """SQLite-backed symbol store, updated incrementally by ``sync``.
+
+    Use ``":memory:"`` as *db_path* for a throwaway index.
+    """
+
+    def __init__(self, db_path: Path | str):
+        self._conn = sqlite3.connect(str(db_path), timeout=10)
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != _SCHEMA_VERSION:
+            for table in ("files", "sections", *_SYMBOL_TABLES):
+                self._conn.execute(f"DROP TABLE IF EXISTS {table}")
+            self._conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "SymbolIndex":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def sync(self, root: Path, paths: list[str]) -> set[str]:
+        """Bring the index in line with *paths*; return changed/removed paths.
+
+        Files are fingerprinted by mtime/size; only when those moved is the
+        content hashed, and only when the hash differs are symbols re-parsed
+        (see _parse_all). A plain `touch` therefore does not count as a change.
+        """
+        known = {
+            row[0]: row[1:]
+            for row in self._conn.execute("SELECT path, mtime_ns, size, hash FROM files")
+        }
+        stats: dict[str, os.stat_result] = {}
+        candidates: list[str] = []
+        for rel in paths:
+            try:
+                st = os.stat(root / rel)
+            except OSError:
+                continue
+            stats[rel] = st
+            prev = known.get(rel)
+            if not prev or prev[0] != st.st_mtime_ns or prev[1] != st.st_size:
+                candidates.append(rel)
+
+        loaded = _parse_all([
+            (str(root), rel, known[rel][2] if rel in known else "")
+            for rel in candidates
+        ])
+
+        changed: set[str] = set()
+        with self._conn:
+            for rel, symbols in zip(candidates, loaded):
+                if symbols is None:
+                    continue
+                st = stats[rel]
+                prev = known.get(rel)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+                    (rel, st.st_mtime_ns, st.st_size, symbols.hash),
+                )
+                if prev and prev[2] == symbols.hash:
+                    continue
+                changed.add(rel)
+                self._store(symbols)
+
+            removed = set(known) - set(stats)
+            for rel in removed:
+                self._conn.execute("DELETE FROM files WHERE path = ?", (rel,))
+                self._delete_symbols(rel)
+            changed |= removed
+
+        return changed
+
+    def _delete_symbols(self, rel: str) -> None:
+        for table in _SYMBOL_TABLES:
+            self._conn.execute(f"DELETE FROM {table} WHERE path = ?", (rel,))
+
+    def _store(self, s: FileSymbols) -> None:
+        self._delete_symbols(s.path)
+        self._conn.executemany(
+            "INSERT INTO fields VALUES (?, ?, ?, ?, ?, ?)",
+            [(s.path, i, *f) for i, f in enumerate(s.fields)],
+        )
+        self._conn.executemany(
+            "INSERT INTO routes VALUES (?, ?, ?, ?)",
+            [(s.path, i, *r) for i, r in enumerate(s.routes)],
+        )
+        self._conn.executemany(
+            "INSERT INTO frontend VALUES (?, ?, ?, ?)",
+            [(s.path, *f) for f in s.frontend],
+        )
+        if s.migration:
+            self._conn.execute(
+                "INSERT INTO migrations VALUES (?, ?, ?)", (s.path, *s.migration)
+            )
+
+    # --- Queries ---
+
+    def entities(self) -> dict[str, list[str]]:
+        """Entity name -> ``name:Type[@Relation]`` fields, ordered by file path."""
+        entities: dict[str, list[str]] = {}
+        for entity, name, typ, relation in self._conn.execute(
+            "SELECT entity, name, type, relation FROM fields ORDER BY path, position"
+        ):
+            entry = f"{name}:{typ}" + (f"@{relation}" if relation else "")
+            entities.setdefault(entity, []).append(entry)
+        return entities
+
+    def routes(self) -> dict[str, list[str]]:
+        """Controller -> ``METHOD /path`` routes."""
+        by_controller: dict[str, list[str]] = {}
+        for controller, route in self._conn.execute(
+            "SELECT controller, route FROM routes ORDER BY controller, path, position"
+        ):
+            routes = by_controller.setdefault(controller, [])
+            if route not in routes:
+                routes.append(route)
+        return by_controller
+
+    def frontend(self, kind: str) -> list[tuple[str, str, str]]:
+        """(path, name, selector) of Angular artifacts of one kind."""
+        return list(self._conn.execute(
+            "SELECT path, name, selector FROM frontend WHERE kind = ? ORDER BY path, name",
+            (kind,),
+        ))
+
+    def migrations(self) -> list[tuple[str, str, str]]:
+        """(path, version, description), ordered by Flyway version."""
+        rows = list(self._conn.execute("SELECT path, version, description FROM migrations"))
+        return sorted(rows, key=lambda r: (_version_key(r[1]), r[0]))
+
+    def get_section(self, name: str) -> list[str] | None:
+        row = self._conn.execute(
+            "SELECT content FROM sections WHERE name = ?", (name,)
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0].split("\n") if row[0] else []
+
+    def put_section(self, name: str, lines: list[str]) -> None:
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sections VALUES (?, ?)", (name, "\n".join(lines))
+            )
+
+
+def _version_key(version: str) -> tuple[int, ...]:
+    return tuple(int(p) for p in version.split(".") if p.isdigit())
@@ -0,0 +1,168 @@
+"""Source ↔ test mapping built from the project's file index.
+
+Phase 4 pre-reads the existing tests of the changed sources. A test belongs
+to a source when:
+- Java: it is in the source's package under src/test/java and named after
+  the class (FooTest, FooTests, FooIT, FooIntegrationTest, TestFoo), imports
+  the class, or is in the same package and references it by name;
+- Angular/TS: it is the co-located ``<name>.spec.ts`` or imports the source
+  by relative path.
+
+Only the imports and type names of each test are kept, in a cache of their
+own (separate from the prompt input cache, so a large test suite does not
+evict pre-read sources). Rebuilding the map for a retry re-reads only tests
+whose mtime or size changed.
+"""
+
+import posixpath
+import re
+from dataclasses import dataclass, field
+from pathlib import PurePosixPath
+
+from .codebase import FileIndex
+from .filecache import FileCache
+
+_JAVA_ROOT_RE = re.compile(r"(?:^|/)src/(main|test)/(?:java|kotlin)/")
+_JAVA_SUFFIXES = (".java", ".kt")
+# Longest first: FooIntegrationTest must not resolve to FooIntegration
+_TEST_SUFFIXES = ("IntegrationTest", "Tests", "Test", "IT")
+_JAVA_IMPORT_RE = re.compile(r"^\s*import\s+(?:static\s+)?([\w.]+)", re.MULTILINE)
+_JAVA_TYPE_REF_RE = re.compile(r"\b[A-Z]\w*")
+_TS_IMPORT_RE = re.compile(r"""(?:from|import)\s*\(?\s*['"](\.{1,2}/[^'"]+)['"]""")
+_TS_SPEC_RE = re.compile(r"\.(?:spec|test)\.ts$")
+
+# Parsed test references; small entries, so room for a large test suite
+_REFS_CACHE = FileCache(max_entries=16_384)
+
+
+@dataclass(frozen=True)
+class _TestRefs:
+    imports: tuple[str, ...]
+    names: frozenset[str]  # capitalised identifiers (Java) — empty for TS
+
+
+def _java_refs(content: str) -> _TestRefs:
+    return _TestRefs(
+        tuple(_JAVA_IMPORT_RE.findall(content)),
+        frozenset(_JAVA_TYPE_REF_RE.findall(content)),
+    )
+
+
+def _ts_refs(content: str) -> _TestRefs:
+    return _TestRefs(tuple(_TS_IMPORT_RE.findall(content)), frozenset())
+
+
+def _java_name(rel: str) -> tuple[str, str, str] | None:
+    """(source set, package, class) of a Java/Kotlin file, e.g. ("test", "com.acme", "FooIT")."""
+    match = _JAVA_ROOT_RE.search(rel)
+    if not match or not rel.endswith(_JAVA_SUFFIXES):
+        return None
+    qualified = PurePosixPath(rel[match.end():]).with_suffix("").as_posix()
+    package, _, cls = qualified.rpartition("/")
+    return match.group(1), package.replace("/", "."), cls
+
+
+def _subject_class(test_class: str) -> str | None:
+    """Class a test is named after: FooTest -> Foo, TestFoo -> Foo."""
+    for suffix in _TEST_SUFFIXES:
+        if test_class.endswith(suffix) and len(test_class) > len(suffix):
+            return test_class[: -len(suffix)]
+    if test_class.startswith("Test") and test_class[4:5].isupper():
+        return test_class[4:]
+    return None
+
+
+def is_test_file(rel: str) -> bool:
+    name = _java_name(rel)
+    if name:
+        return name[0] == "test"
+    return bool(_TS_SPEC_RE.search(rel))
+
+
+@dataclass
+class TestMap:
+    """Which existing test files cover which source files."""
+
+    tests: dict[str, list[str]] = field(default_factory=dict)  # source -> tests
+
+    def _link(self, source: str, test: str) -> None:
+        linked = self.tests.setdefault(source, [])
+        if test not in linked:
+            linked.append(test)
+
+    def tests_for(self, source: str) -> list[str]:
+        return self.tests.get(source, [])
+
+    def ranked(self, sources: list[str], churn: dict[str, int]) -> dict[str, int]:
+        """Tests of the given sources -> summed churn of those sources, highest first.
+
+        A test covering several changed sources ranks by their total change.
+        """
+        weights: dict[str, int] = {}
+        for source in sources:
+            for test in self.tests_for(source):
+                weights[test] = weights.get(test, 0) + churn.get(source, 0)
+        return dict(sorted(weights.items(), key=lambda item: -item[1]))
+
+
+def build_test_map(index: FileIndex) -> TestMap:
+    """Map each source file in the index to the tests that exercise it."""
+    test_map = TestMap()
+    files = set(index.files)
+
+    java_sources: dict[str, str] = {}  # fully qualified class -> path
+    by_package: dict[str, list[tuple[str, str]]] = {}  # package -> (class, path)
+    java_tests: list[tuple[str, str, str]] = []  # (path, package, class)
+    ts_specs: list[str] = []
+    for rel in index.files:
+        name = _java_name(rel)
+        if name:
+            source_set, package, cls = name
+            if source_set == "main":
+                java_sources[f"{package}.{cls}" if package else cls] = rel
+                by_package.setdefault(package, []).append((cls, rel))
+            else:
+                java_tests.append((rel, package, cls))
+        elif _TS_SPEC_RE.search(rel):
+            ts_specs.append(rel)
+
+    for rel, package, cls in java_tests:
+        # Naming convention: same package, FooTest & co.
+        subject = _subject_class(cls)
+        if subject:
+            source = java_sources.get(f"{package}.{subject}" if package else subject)
+            if source:
+                test_map._link(source, rel)
+
+        refs = _REFS_CACHE.read(index.root / rel, _java_refs)
+        if refs is None:
+            continue
+        # Imports: tests for classes in other packages (e.g. web-layer ITs)
+        for imported in refs.imports:
+            # Static imports name a member; try the enclosing class too
+            source = java_sources.get(imported) or java_sources.get(imported.rpartition(".")[0])
+            if source:
+                test_map._link(source, rel)
+        # Same package: classes are used without an import
+        for source_cls, source in by_package.get(package, []):
+            if source_cls in refs.names:
+                test_map._link(source, rel)
+
+    for rel in ts_specs:
+        # Angular CLI convention: foo.component.spec.ts next to foo.component.ts
+        colocated = _TS_SPEC_RE.sub(".ts", rel)
+        if colocated in files:
+            test_map._link(colocated, rel)
+
+        refs = _REFS_CACHE.read(index.root / rel, _ts_refs)
+        if refs is None:
+            continue
+        spec_dir = posixpath.dirname(rel)
+        for specifier in refs.imports:
+            target = posixpath.normpath(posixpath.join(spec_dir, specifier))
+            for candidate in (target, f"{target}.ts", f"{target}/index.ts"):
+                if candidate in files and not is_test_file(candidate):
+                    test_map._link(candidate, rel)
+                    break
+
+    return test_map
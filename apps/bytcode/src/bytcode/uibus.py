@@ -0,0 +1,40 @@
+"""Batched orchestrator → UI updates.
+
+The orchestrator runs in a worker thread. App.call_from_thread per update
+blocks that thread until the UI has handled it, so a busy agent (hundreds
+of tool calls per minute) is throttled by UI latency. UpdateBus.post() only
+appends to a list; the app drains it from a UI timer at most a fixed number
+of times per second and applies each batch in posting order.
+"""
+
+import threading
+from typing import Any, Callable
+
+Update = tuple[Callable[..., Any], tuple[Any, ...]]
+
+
+class UpdateBus:
+    """Thread-safe FIFO of pending UI callbacks."""
+
+    def __init__(self) -> None:
+        self._pending: list[Update] = []
+        self._lock = threading.Lock()
+        # Metrics: updates posted, non-empty batches drained, largest batch
+        self.posted = 0
+        self.batches = 0
+        self.max_batch = 0
+
+    def post(self, callback: Callable[..., Any], *args: Any) -> None:
+        """Queue callback(*args) for the next UI drain (never blocks on the UI)."""
+        with self._lock:
+            self._pending.append((callback, args))
+            self.posted += 1
+
+    def drain(self) -> list[Update]:
+        """Take all pending updates, oldest first."""
+        with self._lock:
+            batch, self._pending = self._pending, []
+            if batch:
+                self.batches += 1
+                self.max_batch = max(self.max_batch, len(batch))
+        return batch
@@ -1,6 +1,6 @@
 """Done-criteria verification for workflow phases."""
 
-import subprocess
+import asyncio
 from pathlib import Path
 
 from .config import Criterion, Phase
@@ -15,43 +15,59 @@ def _check_glob(pattern: str, project_dir: Path) -> tuple[bool, str]:
     return False, f"no match: {pattern}"
 
 
-def _check_jq(expression: str, file: str, project_dir: Path) -> tuple[bool, str]:
-    """Check a jq expression against a JSON file."""
+async def _check_jq(expression: str, file: str, project_dir: Path) -> tuple[bool, str]:
+    """Check a jq expression against a JSON file (jq runs as an asyncio subprocess)."""
     filepath = project_dir / file
     if not filepath.exists():
         return False, f"file not found: {file}"
     try:
-        result = subprocess.run(
-            ["jq", "-e", expression, str(filepath)],
-            capture_output=True,
-            text=True,
-            timeout=5,
+        proc = await asyncio.create_subprocess_exec(
+            "jq", "-e", expression, str(filepath),
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL,
         )
-        if result.returncode == 0:
-            return True, f"jq ok: {expression}"
-        return False, f"jq failed: {expression}"
-    except subprocess.TimeoutExpired:
-        return False, f"jq timeout: {expression}"
     except FileNotFoundError:
         return False, "jq not installed"
+    try:
+        returncode = await asyncio.wait_for(proc.wait(), timeout=5)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        return False, f"jq timeout: {expression}"
+    if returncode == 0:
+        return True, f"jq ok: {expression}"
+    return False, f"jq failed: {expression}"
 
 
-def verify_phase(phase: Phase, project_dir: Path) -> tuple[bool, str]:
-    """Verify all done-criteria for a phase. All must pass (compound AND)."""
+async def _check_async(criterion: Criterion, project_dir: Path) -> tuple[bool, str]:
+    if criterion.type == "glob":
+        return await asyncio.to_thread(_check_glob, criterion.pattern, project_dir)
+    if criterion.type == "jq":
+        return await _check_jq(criterion.pattern, criterion.file, project_dir)
+    return False, f"unknown criterion type: {criterion.type}"
+
+
+async def verify_phase_async(phase: Phase, project_dir: Path) -> tuple[bool, str]:
+    """Verify all done-criteria for a phase. All must pass (compound AND).
+
+    Criteria are checked concurrently without blocking the event loop; the
+    message lists results up to and including the first failure.
+    """
     if not phase.criteria:
         return True, "no criteria"
 
+    results = await asyncio.gather(
+        *(_check_async(criterion, project_dir) for criterion in phase.criteria)
+    )
     messages: list[str] = []
-    for criterion in phase.criteria:
-        if criterion.type == "glob":
-            ok, msg = _check_glob(criterion.pattern, project_dir)
-        elif criterion.type == "jq":
-            ok, msg = _check_jq(criterion.pattern, criterion.file, project_dir)
-        else:
-            ok, msg = False, f"unknown criterion type: {criterion.type}"
-
+    for ok, msg in results:
         messages.append(msg)
         if not ok:
             return False, "; ".join(messages)
 
     return True, "; ".join(messages)
+
+
+def verify_phase(phase: Phase, project_dir: Path) -> tuple[bool, str]:
+    """Blocking verify_phase_async, for callers without an event loop."""
+    return asyncio.run(verify_phase_async(phase, project_dir))
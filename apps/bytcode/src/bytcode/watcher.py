@@ -0,0 +1,124 @@
+"""Background watcher that keeps structure.md current while an agent runs.
+
+Uses watchdog (inotify/FSEvents/kqueue) when installed — ``pip install
+bytcode[watch]`` — and falls back to polling otherwise. Every refresh is a
+regular incremental write_structure call, so only files the agent changed
+are re-parsed.
+"""
+
+import threading
+import time
+from pathlib import Path
+from typing import Callable
+
+from .codebase import invalidate_file_index, is_indexed_path, write_structure
+
+try:
+    from watchdog.events import FileSystemEvent, FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # optional dependency
+    Observer = None
+
+# Polling interval when watchdog is not available
+_POLL_INTERVAL_S = 3.0
+# Quiet period after the last file event before refreshing
+_DEBOUNCE_S = 0.5
+
+
+class StructureWatcher:
+    """Applies file changes to the structure index in a background thread."""
+
+    def __init__(
+        self,
+        project_dir: Path,
+        *,
+        on_error: Callable[[str], None] | None = None,
+        poll_interval: float = _POLL_INTERVAL_S,
+    ):
+        self.project_dir = project_dir
+        self.on_error = on_error
+        self.poll_interval = poll_interval
+        self.refreshed_at: float = 0.0  # monotonic time of last refresh
+        self._dirty = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._observer = None
+
+    @property
+    def backend(self) -> str:
+        return "watchdog" if Observer is not None else "polling"
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        if Observer is not None:
+            self._observer = Observer()
+            self._observer.schedule(
+                _ChangeHandler(self), str(self.project_dir), recursive=True
+            )
+            self._observer.daemon = True
+            self._observer.start()
+        self._thread = threading.Thread(
+            target=self._loop, name="bytcode-structure-watcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop watching and run one final refresh so structure.md is current."""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._dirty.set()
+        self._thread.join()
+        self._thread = None
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+        self._refresh()
+
+    def mark_dirty(self) -> None:
+        self._dirty.set()
+
+    def _loop(self) -> None:
+        while not self._stopping.is_set():
+            if self._observer is not None:
+                self._dirty.wait()
+                if self._stopping.is_set():
+                    break
+                # Debounce: agents write files in bursts
+                while self._dirty.is_set() and not self._stopping.is_set():
+                    self._dirty.clear()
+                    time.sleep(_DEBOUNCE_S)
+            elif self._stopping.wait(self.poll_interval):
+                break
+            self._refresh()
+
+    def _refresh(self) -> None:
+        try:
+            invalidate_file_index(self.project_dir)  # new untracked files
+            write_structure(self.project_dir)
+            self.refreshed_at = time.monotonic()
+        except Exception as e:
+            if self.on_error:
+                self.on_error(f"structure watcher: {e}")
+
+
+if Observer is not None:
+
+    class _ChangeHandler(FileSystemEventHandler):
+        def __init__(self, watcher: StructureWatcher):
+            self._watcher = watcher
+            self._root = str(watcher.project_dir)
+
+        def on_any_event(self, event: FileSystemEvent) -> None:
+            if event.is_directory:
+                return
+            for path in (event.src_path, getattr(event, "dest_path", "")):
+                if not path or not str(path).startswith(self._root):
+                    continue
+                rel = str(path)[len(self._root):].lstrip("/\\").replace("\\", "/")
+                if rel and is_indexed_path(rel):
+                    self._watcher.mark_dirty()
+                    return